@@ -4,15 +4,248 @@ PostgreSQL 連線管理與資料操作
 
 import asyncio
 import logging
-from datetime import datetime
+import os
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from itertools import compress
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-from decimal import Decimal
+from typing import Optional, List, Dict, Any, Mapping, Sequence, Union
 
 import asyncpg
 
 logger = logging.getLogger(__name__)
 
+# Schema DDL (import 時讀取一次，避免在 event loop 上做同步檔案 I/O)
+_SCHEMA_PATH = Path(__file__).parent / "schema.sql"
+_SCHEMA_SQL = _SCHEMA_PATH.read_text() if _SCHEMA_PATH.exists() else None
+
+# 每批寫入筆數
+# unnest 每批只送固定數量的 array 參數，不受 PostgreSQL 65535 參數上限限制，
+# 批次越大 round-trip 越少
+BATCH_SIZE = 5000
+
+# 連接池大小 (批次抓取時多個用戶並行寫入，連接池需足以支撐並行數)
+POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN", "4"))
+POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX", "32"))
+
+# 超過此筆數的交易列表改在 worker thread 轉換成欄位陣列，避免阻塞 event loop
+_OFFLOAD_MIN_ROWS = 2000
+
+# 交易表欄位：必填欄位以 itemgetter 一次取出，選填欄位缺少時為 None
+# (順序需與 INSERT 語句一致)
+_HL_REQUIRED = (
+    "wallet_address", "trade_id", "symbol", "side",
+    "price", "quantity", "executed_at",
+)
+_HL_OPTIONAL = (
+    "tx_hash", "order_id", "direction", "fee", "fee_token",
+    "realized_pnl", "is_taker", "position_before",
+)
+_HL_COLUMNS = _HL_REQUIRED + _HL_OPTIONAL
+
+_ORDERLY_REQUIRED = (
+    "wallet_address", "account_id", "trade_id", "symbol", "side",
+    "price", "quantity", "executed_at",
+)
+_ORDERLY_OPTIONAL = (
+    "order_id", "fee", "fee_token", "realized_pnl", "is_taker",
+)
+_ORDERLY_COLUMNS = _ORDERLY_REQUIRED + _ORDERLY_OPTIONAL
+
+# 交易紀錄以 Unix 毫秒 (executed_at_ms) 提供成交時間，寫入時轉為 executed_at (timestamptz)
+_EXECUTED_AT = "executed_at"
+_EXECUTED_AT_MS = "executed_at_ms"
+
+
+def _trade_keys(columns: tuple) -> tuple:
+    """資料表欄位名稱對應到交易紀錄的 key"""
+    return tuple(_EXECUTED_AT_MS if c == _EXECUTED_AT else c for c in columns)
+
+
+# 唯一鍵在欄位陣列中的位置 (對應 UNIQUE 約束)
+_HL_KEY = (_HL_COLUMNS.index("wallet_address"), _HL_COLUMNS.index("trade_id"))
+_ORDERLY_KEY = (_ORDERLY_COLUMNS.index("account_id"), _ORDERLY_COLUMNS.index("trade_id"))
+
+_get_hl_required = itemgetter(*_trade_keys(_HL_REQUIRED))
+_get_orderly_required = itemgetter(*_trade_keys(_ORDERLY_REQUIRED))
+
+# 交易輸入：list of dict，或已是欄位式的 {key: 陣列} (key 與交易紀錄相同，成交時間為 executed_at_ms)
+TradesInput = Union[List[Dict[str, Any]], Mapping[str, Sequence[Any]]]
+
+# INSERT ... unnest 語句，回傳實際插入紀錄的錢包以便分錢包累計 (conn.fetch 會透過 asyncpg 的 statement cache 在每條連接上只 prepare 一次)
+_HL_INSERT_SQL = """
+    INSERT INTO hyperliquid_trades (
+        wallet_address, trade_id, symbol, side, price, quantity, executed_at,
+        tx_hash, order_id, direction, fee, fee_token,
+        realized_pnl, is_taker, position_before
+    )
+    SELECT u.* FROM unnest(
+        $1::varchar[], $2::bigint[], $3::varchar[], $4::varchar[], $5::decimal[], $6::decimal[], $7::timestamptz[],
+        $8::varchar[], $9::bigint[], $10::varchar[], $11::decimal[], $12::varchar[],
+        $13::decimal[], $14::boolean[], $15::decimal[]
+    ) AS u(
+        wallet_address, trade_id, symbol, side, price, quantity, executed_at,
+        tx_hash, order_id, direction, fee, fee_token,
+        realized_pnl, is_taker, position_before
+    )
+    ON CONFLICT (wallet_address, trade_id) DO NOTHING
+    RETURNING wallet_address
+"""
+
+_ORDERLY_INSERT_SQL = """
+    INSERT INTO orderly_trades (
+        wallet_address, account_id, trade_id, symbol, side, price, quantity, executed_at,
+        order_id, fee, fee_token, realized_pnl, is_taker
+    )
+    SELECT u.* FROM unnest(
+        $1::varchar[], $2::varchar[], $3::bigint[], $4::varchar[], $5::varchar[], $6::decimal[], $7::decimal[], $8::timestamptz[],
+        $9::bigint[], $10::decimal[], $11::varchar[], $12::decimal[], $13::boolean[]
+    ) AS u(
+        wallet_address, account_id, trade_id, symbol, side, price, quantity, executed_at,
+        order_id, fee, fee_token, realized_pnl, is_taker
+    )
+    ON CONFLICT (account_id, trade_id) DO NOTHING
+    RETURNING wallet_address
+"""
+
+# 交易寫入 transaction 不等待 WAL flush 即回傳 commit。
+# 交易與抓取狀態在同一個 transaction，資料庫當機時最多一起遺失最後一批，
+# last_fetch_time 不會超前於已寫入的交易，下次執行會重新抓取。
+_ASYNC_COMMIT_SQL = "SET LOCAL synchronous_commit = off"
+
+# fetch_status UPSERT 語句 (total_trades_fetched 為累加)
+_FETCH_STATUS_UPSERT_SQL = """
+    INSERT INTO fetch_status (
+        wallet_address, platform, last_fetch_time, last_fetch_at,
+        total_trades_fetched, last_error
+    ) VALUES ($1, $2, $3, NOW(), $4, $5)
+    ON CONFLICT (wallet_address, platform)
+    DO UPDATE SET
+        last_fetch_time = COALESCE($3, fetch_status.last_fetch_time),
+        last_fetch_at = NOW(),
+        total_trades_fetched = fetch_status.total_trades_fetched + $4,
+        last_error = $5
+"""
+
+# 多筆 fetch_status 一次 UPSERT (同一語句中 (wallet_address, platform) 不可重複)
+_FETCH_STATUSES_UPSERT_SQL = """
+    INSERT INTO fetch_status (
+        wallet_address, platform, last_fetch_time, last_fetch_at,
+        total_trades_fetched, last_error
+    )
+    SELECT u.wallet_address, u.platform, u.last_fetch_time, NOW(),
+           u.total_trades_fetched, u.last_error
+    FROM unnest(
+        $1::varchar[], $2::varchar[], $3::timestamptz[], $4::bigint[], $5::text[]
+    ) AS u(wallet_address, platform, last_fetch_time, total_trades_fetched, last_error)
+    ON CONFLICT (wallet_address, platform)
+    DO UPDATE SET
+        last_fetch_time = COALESCE(EXCLUDED.last_fetch_time, fetch_status.last_fetch_time),
+        last_fetch_at = NOW(),
+        total_trades_fetched = fetch_status.total_trades_fetched + EXCLUDED.total_trades_fetched,
+        last_error = EXCLUDED.last_error
+"""
+
+
+def _to_columns(
+    trades: TradesInput,
+    required: tuple,
+    optional: tuple,
+    get_required: itemgetter,
+) -> List[Sequence[Any]]:
+    """
+    將交易紀錄轉為欄位陣列 (SoA)，順序為 required + optional
+
+    欄位式輸入直接沿用各欄陣列，不需逐筆轉置；缺少的選填欄位補 None。
+    數值欄位直接交給 asyncpg 的 numeric codec 處理 (Decimal / str / int 皆可)，
+    成交時間由毫秒轉為 datetime (timestamptz codec 需要 datetime)。
+    """
+    if isinstance(trades, Mapping):
+        size = len(trades[required[0]])
+        data = [trades[k] for k in _trade_keys(required)] + [
+            trades[k] if k in trades else [None] * size for k in optional
+        ]
+    else:
+        data = list(zip(*(
+            get_required(trade) + tuple(map(trade.get, optional))
+            for trade in trades
+        )))
+
+    if data:
+        i = required.index(_EXECUTED_AT)
+        data[i] = [
+            datetime.fromtimestamp(ms / 1000, tz=timezone.utc) for ms in data[i]
+        ]
+    return data
+
+
+def _status_columns(statuses: List[Dict[str, Any]]) -> List[List[Any]]:
+    """
+    將抓取狀態轉為 _FETCH_STATUSES_UPSERT_SQL 的欄位陣列
+
+    同一 (wallet_address, platform) 出現多次時合併：
+    last_fetch_time 取最新、total_trades_fetched 加總、last_error 取最後一筆。
+
+    Args:
+        statuses: 抓取狀態列表
+
+    Returns:
+        [wallet_address[], platform[], last_fetch_time[], total_trades_fetched[], last_error[]]
+    """
+    merged: Dict[tuple, List[Any]] = {}
+    for status in statuses:
+        key = (status["wallet_address"], status["platform"])
+        last_fetch_time = status.get("last_fetch_time")
+        fetched = status.get("total_trades_fetched", 0)
+        error = status.get("last_error")
+        row = merged.get(key)
+        if row is None:
+            merged[key] = [key[0], key[1], last_fetch_time, fetched, error]
+            continue
+        if last_fetch_time is not None and (row[2] is None or last_fetch_time > row[2]):
+            row[2] = last_fetch_time
+        row[3] += fetched
+        row[4] = error
+
+    return [list(column) for column in zip(*merged.values())]
+
+
+def _iter_batches(data: List[Sequence[Any]], total: int):
+    """
+    依 BATCH_SIZE 逐批產生欄位切片
+
+    單批即可容納時直接沿用原欄位、不做任何複製；
+    多批時以 generator 逐批切片，由 fetchmany 送出時才建立，不會一次建立全部批次。
+
+    Args:
+        data: 欄位陣列
+        total: 紀錄數
+
+    Yields:
+        每批的欄位陣列
+    """
+    if total <= BATCH_SIZE:
+        yield data
+        return
+    for i in range(0, total, BATCH_SIZE):
+        yield [column[i:i + BATCH_SIZE] for column in data]
+
+
+async def _build_columns(
+    trades: TradesInput,
+    required: tuple,
+    optional: tuple,
+    get_required: itemgetter,
+) -> List[Sequence[Any]]:
+    """轉換欄位陣列；大量資料時交給 asyncio.to_thread，讓 event loop 繼續處理其他 I/O"""
+    if not isinstance(trades, Mapping) and len(trades) >= _OFFLOAD_MIN_ROWS:
+        return await asyncio.to_thread(
+            _to_columns, trades, required, optional, get_required
+        )
+    return _to_columns(trades, required, optional, get_required)
+
 
 class PostgresManager:
     """PostgreSQL 資料庫管理器"""
@@ -41,12 +274,20 @@ class PostgresManager:
                 database=self.database,
                 user=self.user,
                 password=self.password,
-                min_size=2,
-                max_size=10,
+                min_size=POOL_MIN_SIZE,
+                max_size=POOL_MAX_SIZE,
+                # 用戶之間的閒置空檔不要回收連接，避免重連與重新 prepare
+                max_inactive_connection_lifetime=300,
+                statement_cache_size=200,
+                command_timeout=60,
+                # 短小的寫入語句不值得付 JIT 編譯成本
+                server_settings={"jit": "off"},
+            )
+            logger.info(
+                "PostgreSQL 連接成功: %s:%s/%s", self.host, self.port, self.database
             )
-            logger.info(f"PostgreSQL 連接成功: {self.host}:{self.port}/{self.database}")
         except Exception as e:
-            logger.error(f"PostgreSQL 連接失敗: {e}")
+            logger.error("PostgreSQL 連接失敗: %s", e)
             raise
 
     async def disconnect(self):
@@ -55,110 +296,267 @@ class PostgresManager:
             await self.pool.close()
             logger.info("PostgreSQL 連接已關閉")
 
+    @asynccontextmanager
+    async def session(self):
+        """
+        固定取得一條連接，供連續多個操作重複使用，省去每次從連接池取得連接
+
+        各查詢方法皆接受 conn 參數:
+            async with pg.session() as conn:
+                status = await pg.get_fetch_status(wallet, "hyperliquid", conn=conn)
+                await pg.upsert_hyperliquid_trades(trades, conn=conn)
+        """
+        async with self.pool.acquire() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def _acquire(self, conn: Optional[asyncpg.Connection] = None):
+        """沿用呼叫端提供的連接，未提供時才從連接池取得"""
+        if conn is not None:
+            yield conn
+        else:
+            async with self.pool.acquire() as acquired:
+                yield acquired
+
     async def init_schema(self):
         """初始化資料庫 schema"""
-        schema_path = Path(__file__).parent / "schema.sql"
-
-        if not schema_path.exists():
-            logger.warning(f"Schema 檔案不存在: {schema_path}")
+        if _SCHEMA_SQL is None:
+            logger.warning("Schema 檔案不存在: %s", _SCHEMA_PATH)
             return
 
         async with self.pool.acquire() as conn:
-            with open(schema_path, "r") as f:
-                schema_sql = f.read()
-            await conn.execute(schema_sql)
+            await conn.execute(_SCHEMA_SQL)
             logger.info("PostgreSQL schema 初始化完成")
 
+    async def _has_trades(
+        self, conn: asyncpg.Connection, table: str, wallets: List[str]
+    ) -> bool:
+        """檢查指定錢包在交易表中是否已有任何紀錄 (EXISTS，找到一筆即停止)"""
+        return await conn.fetchval(
+            f"SELECT EXISTS(SELECT 1 FROM {table} WHERE wallet_address = ANY($1::varchar[]))",
+            wallets,
+        )
+
+    async def _copy_trades(
+        self,
+        conn: asyncpg.Connection,
+        table: str,
+        columns: tuple,
+        data: List[Sequence[Any]],
+        fetch_statuses: Optional[List[Dict[str, Any]]] = None,
+    ) -> Optional[int]:
+        """
+        以 COPY 寫入交易紀錄 (適用於錢包首次抓取，預期無重複)
+
+        COPY 包在 transaction (巢狀時為 savepoint) 中，遇到唯一鍵衝突會整批回滾，
+        由呼叫端改走 unnest + ON CONFLICT 路徑。
+
+        Args:
+            conn: 資料庫連接
+            table: 資料表名稱
+            columns: 欄位名稱
+            data: 欄位陣列 (與 columns 順序一致)
+            fetch_statuses: 抓取狀態列表，與 COPY 在同一個 transaction 中寫入
+
+        Returns:
+            寫入的紀錄數；發生唯一鍵衝突時回傳 None
+        """
+        total = len(data[0])
+
+        try:
+            async with conn.transaction():
+                await conn.execute(_ASYNC_COMMIT_SQL)
+                await conn.copy_records_to_table(
+                    table, records=zip(*data), columns=columns
+                )
+                if fetch_statuses:
+                    # wallet_address 為第一個欄位，COPY 成功即全部寫入
+                    await self._write_fetch_statuses(
+                        conn, fetch_statuses, Counter(data[0])
+                    )
+        except asyncpg.UniqueViolationError:
+            logger.info("COPY %s 發生重複紀錄，改用 unnest 寫入", table)
+            return None
+
+        logger.info("COPY 寫入 %s: %d 筆", table, total)
+        return total
+
+    async def _drop_existing(
+        self,
+        conn: asyncpg.Connection,
+        table: str,
+        columns: tuple,
+        key: tuple,
+        data: List[Sequence[Any]],
+    ) -> List[Sequence[Any]]:
+        """
+        依唯一鍵濾掉資料庫中已存在的交易，縮小增量抓取時的 INSERT 資料量
+
+        ON CONFLICT DO NOTHING 仍保留，作為並行寫入時的保護。
+
+        Args:
+            conn: 資料庫連接
+            table: 資料表名稱
+            columns: 欄位名稱
+            key: 唯一鍵欄位位置 (owner 欄位, trade_id 欄位)
+            data: 欄位陣列
+
+        Returns:
+            僅包含尚未存在之交易的欄位陣列
+        """
+        owner, trade_id = columns[key[0]], columns[key[1]]
+        owners, trade_ids = data[key[0]], data[key[1]]
+
+        existing = await conn.fetch(
+            f"""
+            SELECT {owner}, {trade_id} FROM {table}
+            WHERE ({owner}, {trade_id}) IN (
+                SELECT * FROM unnest($1::varchar[], $2::bigint[])
+            )
+            """,
+            owners,
+            trade_ids,
+        )
+        if not existing:
+            return data
+
+        existing = {tuple(row) for row in existing}
+        keep = [k not in existing for k in zip(owners, trade_ids)]
+        logger.info("略過 %s 已存在紀錄: %d 筆", table, len(existing))
+        return [list(compress(column, keep)) for column in data]
+
+    async def _write_fetch_statuses(
+        self,
+        conn: asyncpg.Connection,
+        fetch_statuses: List[Dict[str, Any]],
+        inserted: Mapping[str, int],
+    ):
+        """
+        在指定連接上寫入抓取狀態 (供交易寫入時併入同一個 transaction)
+
+        Args:
+            conn: 資料庫連接
+            fetch_statuses: 抓取狀態列表 (wallet_address / platform / last_fetch_time)
+            inserted: 各錢包實際插入數
+        """
+        await conn.execute(
+            _FETCH_STATUSES_UPSERT_SQL,
+            *_status_columns(
+                [
+                    {
+                        "wallet_address": status["wallet_address"],
+                        "platform": status["platform"],
+                        "last_fetch_time": status.get("last_fetch_time"),
+                        "total_trades_fetched": inserted.get(status["wallet_address"], 0),
+                    }
+                    for status in fetch_statuses
+                ]
+            ),
+        )
+
+    async def _insert_batches(
+        self,
+        conn: asyncpg.Connection,
+        sql: str,
+        data: List[Sequence[Any]],
+        label: str,
+        fetch_statuses: Optional[List[Dict[str, Any]]] = None,
+    ) -> int:
+        """
+        將交易紀錄切批後以 fetchmany 在同一條連接上 pipeline 寫入
+
+        所有批次一次送出、不逐批等待回應，並與抓取狀態在同一個 transaction 中提交。
+
+        Args:
+            conn: 資料庫連接
+            sql: INSERT ... unnest SQL
+            data: 欄位陣列 (與 INSERT 欄位順序一致)
+            label: 日誌用平台名稱
+            fetch_statuses: 抓取狀態列表 (可選)
+
+        Returns:
+            成功插入的紀錄數
+        """
+        total = len(data[0])
+        n_batches = -(-total // BATCH_SIZE)
+
+        try:
+            async with conn.transaction():
+                await conn.execute(_ASYNC_COMMIT_SQL)
+                result = (
+                    await conn.fetchmany(sql, _iter_batches(data, total))
+                    if total else []
+                )
+                if fetch_statuses:
+                    await self._write_fetch_statuses(
+                        conn, fetch_statuses, Counter(row[0] for row in result)
+                    )
+        except Exception as e:
+            logger.error("批次寫入 %s 失敗: %s", label, e)
+            raise
+
+        logger.info(
+            "批次寫入 %s: %d/%d 筆 (%d batches)",
+            label, len(result), total, n_batches,
+        )
+        return len(result)
+
     # ==================== Hyperliquid Trades ====================
 
     async def upsert_hyperliquid_trades(
-        self, trades: List[Dict[str, Any]]
+        self,
+        trades: TradesInput,
+        fetch_statuses: Optional[List[Dict[str, Any]]] = None,
+        conn: Optional[asyncpg.Connection] = None,
     ) -> int:
         """
         批量插入 Hyperliquid 交易紀錄 (UPSERT)
 
         Args:
-            trades: 交易紀錄列表
+            trades: 交易紀錄列表，或欄位式的 {欄位名稱: 陣列}
+            fetch_statuses: 抓取狀態列表 (wallet_address / platform / last_fetch_time)，
+                提供時與交易在同一個 transaction 中寫入，
+                各錢包的 total_trades_fetched 累加該錢包實際插入數
+            conn: 沿用的資料庫連接 (可選，見 session())
 
         Returns:
             成功插入的紀錄數
         """
-        if not trades:
+        data = await _build_columns(
+            trades, _HL_REQUIRED, _HL_OPTIONAL, _get_hl_required
+        )
+        if not data or not data[0]:
             return 0
 
-        rows = [
-            (
-                trade["wallet_address"],
-                trade["trade_id"],
-                trade.get("tx_hash"),
-                trade["symbol"],
-                trade.get("order_id"),
-                trade["side"],
-                trade.get("direction"),
-                Decimal(str(trade["price"])),
-                Decimal(str(trade["quantity"])),
-                Decimal(str(trade["fee"])) if trade.get("fee") is not None else None,
-                trade.get("fee_token"),
-                Decimal(str(trade["realized_pnl"])) if trade.get("realized_pnl") is not None else None,
-                trade.get("is_taker"),
-                Decimal(str(trade["position_before"])) if trade.get("position_before") is not None else None,
-                trade["executed_at"],
+        async with self._acquire(conn) as conn:
+            # 錢包尚無任何紀錄時 (首次抓取) 走 COPY 快速路徑
+            wallets = list(set(data[0]))
+            if not await self._has_trades(conn, "hyperliquid_trades", wallets):
+                copied = await self._copy_trades(
+                    conn, "hyperliquid_trades", _HL_COLUMNS, data, fetch_statuses
+                )
+                if copied is not None:
+                    return copied
+
+            data = await self._drop_existing(
+                conn, "hyperliquid_trades", _HL_COLUMNS, _HL_KEY, data
+            )
+            return await self._insert_batches(
+                conn, _HL_INSERT_SQL, data, "Hyperliquid", fetch_statuses
             )
-            for trade in trades
-        ]
-
-        BATCH_SIZE = 500
-        inserted = 0
-
-        async with self.pool.acquire() as conn:
-            for i in range(0, len(rows), BATCH_SIZE):
-                batch = rows[i:i + BATCH_SIZE]
-                try:
-                    result = await conn.fetch(
-                        """
-                        INSERT INTO hyperliquid_trades (
-                            wallet_address, trade_id, tx_hash, symbol, order_id,
-                            side, direction, price, quantity, fee, fee_token,
-                            realized_pnl, is_taker, position_before, executed_at
-                        )
-                        SELECT u.* FROM unnest(
-                            $1::varchar[], $2::bigint[], $3::varchar[], $4::varchar[], $5::bigint[],
-                            $6::varchar[], $7::varchar[], $8::decimal[], $9::decimal[], $10::decimal[], $11::varchar[],
-                            $12::decimal[], $13::boolean[], $14::decimal[], $15::timestamptz[]
-                        ) AS u(
-                            wallet_address, trade_id, tx_hash, symbol, order_id,
-                            side, direction, price, quantity, fee, fee_token,
-                            realized_pnl, is_taker, position_before, executed_at
-                        )
-                        ON CONFLICT (wallet_address, trade_id) DO NOTHING
-                        RETURNING trade_id
-                        """,
-                        [r[0] for r in batch],
-                        [r[1] for r in batch],
-                        [r[2] for r in batch],
-                        [r[3] for r in batch],
-                        [r[4] for r in batch],
-                        [r[5] for r in batch],
-                        [r[6] for r in batch],
-                        [r[7] for r in batch],
-                        [r[8] for r in batch],
-                        [r[9] for r in batch],
-                        [r[10] for r in batch],
-                        [r[11] for r in batch],
-                        [r[12] for r in batch],
-                        [r[13] for r in batch],
-                        [r[14] for r in batch],
-                    )
-                    inserted += len(result)
-                    logger.info(f"批次寫入 Hyperliquid: {len(result)}/{len(batch)} 筆 (batch {i // BATCH_SIZE + 1})")
-                except Exception as e:
-                    logger.error(f"批次寫入 Hyperliquid 失敗: {e}")
 
-        return inserted
+    async def has_hyperliquid_trades(
+        self, wallet_address: str, conn: Optional[asyncpg.Connection] = None
+    ) -> bool:
+        """檢查指定錢包是否已有 Hyperliquid 交易紀錄 (比 COUNT(*) 便宜)"""
+        async with self._acquire(conn) as conn:
+            return await self._has_trades(conn, "hyperliquid_trades", [wallet_address])
 
-    async def get_hyperliquid_trades_count(self, wallet_address: str) -> int:
-        """取得指定錢包的 Hyperliquid 交易紀錄數"""
-        async with self.pool.acquire() as conn:
+    async def get_hyperliquid_trades_count(
+        self, wallet_address: str, conn: Optional[asyncpg.Connection] = None
+    ) -> int:
+        """取得指定錢包的 Hyperliquid 交易紀錄數 (精確計數；只需判斷有無紀錄時請用 has_hyperliquid_trades)"""
+        async with self._acquire(conn) as conn:
             row = await conn.fetchrow(
                 "SELECT COUNT(*) FROM hyperliquid_trades WHERE wallet_address = $1",
                 wallet_address
@@ -168,89 +566,59 @@ class PostgresManager:
     # ==================== Orderly Trades ====================
 
     async def upsert_orderly_trades(
-        self, trades: List[Dict[str, Any]]
+        self,
+        trades: TradesInput,
+        fetch_statuses: Optional[List[Dict[str, Any]]] = None,
+        conn: Optional[asyncpg.Connection] = None,
     ) -> int:
         """
         批量插入 Orderly 交易紀錄 (UPSERT)
 
         Args:
-            trades: 交易紀錄列表
+            trades: 交易紀錄列表，或欄位式的 {欄位名稱: 陣列}
+            fetch_statuses: 抓取狀態列表 (wallet_address / platform / last_fetch_time)，
+                提供時與交易在同一個 transaction 中寫入，
+                各錢包的 total_trades_fetched 累加該錢包實際插入數
+            conn: 沿用的資料庫連接 (可選，見 session())
 
         Returns:
             成功插入的紀錄數
         """
-        if not trades:
+        data = await _build_columns(
+            trades, _ORDERLY_REQUIRED, _ORDERLY_OPTIONAL, _get_orderly_required
+        )
+        if not data or not data[0]:
             return 0
 
-        rows = [
-            (
-                trade["wallet_address"],
-                trade["account_id"],
-                trade["trade_id"],
-                trade["symbol"],
-                trade.get("order_id"),
-                trade["side"],
-                Decimal(str(trade["price"])),
-                Decimal(str(trade["quantity"])),
-                Decimal(str(trade["fee"])) if trade.get("fee") is not None else None,
-                trade.get("fee_token"),
-                Decimal(str(trade["realized_pnl"])) if trade.get("realized_pnl") is not None else None,
-                trade.get("is_taker"),
-                trade["executed_at"],
+        async with self._acquire(conn) as conn:
+            # 錢包尚無任何紀錄時 (首次抓取) 走 COPY 快速路徑
+            wallets = list(set(data[0]))
+            if not await self._has_trades(conn, "orderly_trades", wallets):
+                copied = await self._copy_trades(
+                    conn, "orderly_trades", _ORDERLY_COLUMNS, data, fetch_statuses
+                )
+                if copied is not None:
+                    return copied
+
+            data = await self._drop_existing(
+                conn, "orderly_trades", _ORDERLY_COLUMNS, _ORDERLY_KEY, data
+            )
+            return await self._insert_batches(
+                conn, _ORDERLY_INSERT_SQL, data, "Orderly", fetch_statuses
             )
-            for trade in trades
-        ]
-
-        BATCH_SIZE = 500
-        inserted = 0
-
-        async with self.pool.acquire() as conn:
-            for i in range(0, len(rows), BATCH_SIZE):
-                batch = rows[i:i + BATCH_SIZE]
-                try:
-                    result = await conn.fetch(
-                        """
-                        INSERT INTO orderly_trades (
-                            wallet_address, account_id, trade_id, symbol, order_id,
-                            side, price, quantity, fee, fee_token,
-                            realized_pnl, is_taker, executed_at
-                        )
-                        SELECT u.* FROM unnest(
-                            $1::varchar[], $2::varchar[], $3::bigint[], $4::varchar[], $5::bigint[],
-                            $6::varchar[], $7::decimal[], $8::decimal[], $9::decimal[], $10::varchar[],
-                            $11::decimal[], $12::boolean[], $13::timestamptz[]
-                        ) AS u(
-                            wallet_address, account_id, trade_id, symbol, order_id,
-                            side, price, quantity, fee, fee_token,
-                            realized_pnl, is_taker, executed_at
-                        )
-                        ON CONFLICT (account_id, trade_id) DO NOTHING
-                        RETURNING trade_id
-                        """,
-                        [r[0] for r in batch],
-                        [r[1] for r in batch],
-                        [r[2] for r in batch],
-                        [r[3] for r in batch],
-                        [r[4] for r in batch],
-                        [r[5] for r in batch],
-                        [r[6] for r in batch],
-                        [r[7] for r in batch],
-                        [r[8] for r in batch],
-                        [r[9] for r in batch],
-                        [r[10] for r in batch],
-                        [r[11] for r in batch],
-                        [r[12] for r in batch],
-                    )
-                    inserted += len(result)
-                    logger.info(f"批次寫入 Orderly: {len(result)}/{len(batch)} 筆 (batch {i // BATCH_SIZE + 1})")
-                except Exception as e:
-                    logger.error(f"批次寫入 Orderly 失敗: {e}")
 
-        return inserted
+    async def has_orderly_trades(
+        self, wallet_address: str, conn: Optional[asyncpg.Connection] = None
+    ) -> bool:
+        """檢查指定錢包是否已有 Orderly 交易紀錄 (比 COUNT(*) 便宜)"""
+        async with self._acquire(conn) as conn:
+            return await self._has_trades(conn, "orderly_trades", [wallet_address])
 
-    async def get_orderly_trades_count(self, wallet_address: str) -> int:
-        """取得指定錢包的 Orderly 交易紀錄數"""
-        async with self.pool.acquire() as conn:
+    async def get_orderly_trades_count(
+        self, wallet_address: str, conn: Optional[asyncpg.Connection] = None
+    ) -> int:
+        """取得指定錢包的 Orderly 交易紀錄數 (精確計數；只需判斷有無紀錄時請用 has_orderly_trades)"""
+        async with self._acquire(conn) as conn:
             row = await conn.fetchrow(
                 "SELECT COUNT(*) FROM orderly_trades WHERE wallet_address = $1",
                 wallet_address
@@ -260,7 +628,10 @@ class PostgresManager:
     # ==================== Fetch Status ====================
 
     async def get_fetch_status(
-        self, wallet_address: str, platform: str
+        self,
+        wallet_address: str,
+        platform: str,
+        conn: Optional[asyncpg.Connection] = None,
     ) -> Optional[Dict[str, Any]]:
         """
         取得抓取狀態
@@ -268,11 +639,12 @@ class PostgresManager:
         Args:
             wallet_address: 錢包地址
             platform: 平台名稱 ("hyperliquid" / "orderly")
+            conn: 沿用的資料庫連接 (可選，見 session())
 
         Returns:
             抓取狀態或 None
         """
-        async with self.pool.acquire() as conn:
+        async with self._acquire(conn) as conn:
             row = await conn.fetchrow(
                 """
                 SELECT wallet_address, platform, last_fetch_time,
@@ -288,6 +660,37 @@ class PostgresManager:
                 return dict(row)
             return None
 
+    async def get_fetch_statuses(
+        self,
+        wallet_addresses: List[str],
+        conn: Optional[asyncpg.Connection] = None,
+    ) -> Dict[tuple, Dict[str, Any]]:
+        """
+        一次取得多個錢包的抓取狀態 (取代逐一呼叫 get_fetch_status)
+
+        Args:
+            wallet_addresses: 錢包地址列表
+            conn: 沿用的資料庫連接 (可選，見 session())
+
+        Returns:
+            {(wallet_address, platform): 抓取狀態}
+        """
+        if not wallet_addresses:
+            return {}
+
+        async with self._acquire(conn) as conn:
+            rows = await conn.fetch(
+                """
+                SELECT wallet_address, platform, last_fetch_time,
+                       last_fetch_at, total_trades_fetched, last_error
+                FROM fetch_status
+                WHERE wallet_address = ANY($1::varchar[])
+                """,
+                wallet_addresses,
+            )
+
+        return {(row["wallet_address"], row["platform"]): dict(row) for row in rows}
+
     async def upsert_fetch_status(
         self,
         wallet_address: str,
@@ -295,6 +698,7 @@ class PostgresManager:
         last_fetch_time: Optional[datetime] = None,
         total_trades_fetched: int = 0,
         last_error: Optional[str] = None,
+        conn: Optional[asyncpg.Connection] = None,
     ):
         """
         更新或插入抓取狀態
@@ -305,23 +709,11 @@ class PostgresManager:
             last_fetch_time: 上次抓取的最新交易時間
             total_trades_fetched: 總抓取交易數
             last_error: 最後錯誤訊息
+            conn: 沿用的資料庫連接 (可選，見 session())
         """
-        sql = """
-            INSERT INTO fetch_status (
-                wallet_address, platform, last_fetch_time, last_fetch_at,
-                total_trades_fetched, last_error
-            ) VALUES ($1, $2, $3, NOW(), $4, $5)
-            ON CONFLICT (wallet_address, platform)
-            DO UPDATE SET
-                last_fetch_time = COALESCE($3, fetch_status.last_fetch_time),
-                last_fetch_at = NOW(),
-                total_trades_fetched = fetch_status.total_trades_fetched + $4,
-                last_error = $5
-        """
-
-        async with self.pool.acquire() as conn:
+        async with self._acquire(conn) as conn:
             await conn.execute(
-                sql,
+                _FETCH_STATUS_UPSERT_SQL,
                 wallet_address,
                 platform,
                 last_fetch_time,
@@ -329,8 +721,31 @@ class PostgresManager:
                 last_error,
             )
 
+    async def upsert_fetch_statuses(
+        self,
+        statuses: List[Dict[str, Any]],
+        conn: Optional[asyncpg.Connection] = None,
+    ):
+        """
+        以單一 unnest 語句批量更新或插入抓取狀態
+
+        Args:
+            statuses: 抓取狀態列表，每筆包含 wallet_address / platform，
+                以及可選的 last_fetch_time / total_trades_fetched / last_error
+            conn: 沿用的資料庫連接 (可選，見 session())
+        """
+        if not statuses:
+            return
+
+        async with self._acquire(conn) as conn:
+            await conn.execute(_FETCH_STATUSES_UPSERT_SQL, *_status_columns(statuses))
+
     async def update_fetch_error(
-        self, wallet_address: str, platform: str, error: str
+        self,
+        wallet_address: str,
+        platform: str,
+        error: str,
+        conn: Optional[asyncpg.Connection] = None,
     ):
         """更新抓取錯誤訊息"""
         await self.upsert_fetch_status(
@@ -338,4 +753,5 @@ class PostgresManager:
             platform=platform,
             total_trades_fetched=0,
             last_error=error,
+            conn=conn,
         )
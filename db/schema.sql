@@ -89,13 +89,16 @@ CREATE TABLE IF NOT EXISTS fetch_status (
 );
 
 -- 索引
-CREATE INDEX IF NOT EXISTS idx_hl_trades_wallet ON hyperliquid_trades(wallet_address);
+-- 去重查詢 (ON CONFLICT / 已存在紀錄比對) 直接走上方的 UNIQUE 索引:
+--   hyperliquid_trades(wallet_address, trade_id)
+--   orderly_trades(account_id, trade_id)
+--   fetch_status(wallet_address, platform)
+-- 以其前導欄位為條件的單欄索引與之重複，新建立的資料庫不再建立
+-- (既有資料庫的移除方式見 README「Indexes」一節，需手動執行)
+
 CREATE INDEX IF NOT EXISTS idx_hl_trades_executed_at ON hyperliquid_trades(executed_at);
 CREATE INDEX IF NOT EXISTS idx_hl_trades_symbol ON hyperliquid_trades(symbol);
 
 CREATE INDEX IF NOT EXISTS idx_orderly_trades_wallet ON orderly_trades(wallet_address);
-CREATE INDEX IF NOT EXISTS idx_orderly_trades_account ON orderly_trades(account_id);
 CREATE INDEX IF NOT EXISTS idx_orderly_trades_executed_at ON orderly_trades(executed_at);
 CREATE INDEX IF NOT EXISTS idx_orderly_trades_symbol ON orderly_trades(symbol);
-
-CREATE INDEX IF NOT EXISTS idx_fetch_status_wallet_platform ON fetch_status(wallet_address, platform);
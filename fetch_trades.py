@@ -26,6 +26,11 @@ from typing import Optional, List, Dict, Any
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 
+try:
+    import uvloop  # 可選：較快的 event loop (不支援 Windows)
+except ImportError:
+    uvloop = None
+
 from db.postgres import PostgresManager
 from fetchers.hyperliquid import HyperliquidFetcher
 from fetchers.orderly import OrderlyFetcher
@@ -44,8 +49,20 @@ logger = logging.getLogger(__name__)
 # 預設開始抓取時間
 DEFAULT_START_DATE = datetime(2025, 1, 1, tzinfo=timezone.utc)
 
-# 每個用戶間的延遲 (秒)
-USER_DELAY_SECONDS = float(os.getenv("FETCH_DELAY_SECONDS", "0.5"))
+# 同時處理的用戶數上限
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "10"))
+
+# 跨用戶累積的交易達此筆數時寫入 PostgreSQL
+FLUSH_THRESHOLD = 5000
+
+# 讀取用戶時只取抓取需要的欄位
+USER_PROJECTION = {"_id": 1, "wallet_address": 1, "api_key": 1, "api_secret": 1}
+
+# MongoDB cursor 每批回傳的文件數
+USER_BATCH_SIZE = 500
+
+# 平台名稱 (日誌用)
+PLATFORM_LABELS = {"hyperliquid": "Hyperliquid", "orderly": "Orderly"}
 
 
 class TradeFetcher:
@@ -81,6 +98,26 @@ class TradeFetcher:
         self.hl_fetcher = HyperliquidFetcher()
         self.orderly_fetcher = OrderlyFetcher()
 
+        # 限制同時處理的用戶數
+        self.sem = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        # 跨用戶寫入緩衝 (依平台)：交易與對應的抓取狀態一起寫入
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {
+            "hyperliquid": [],
+            "orderly": [],
+        }
+        self._pending_statuses: Dict[str, List[Dict[str, Any]]] = {
+            "hyperliquid": [],
+            "orderly": [],
+        }
+        # 抓取錯誤狀態緩衝 (結束時一次寫入)
+        self._error_statuses: List[Dict[str, Any]] = []
+
+        self._upserts = {
+            "hyperliquid": self.pg.upsert_hyperliquid_trades,
+            "orderly": self.pg.upsert_orderly_trades,
+        }
+
         # 統計資料
         self.stats = {
             "users_processed": 0,
@@ -95,7 +132,7 @@ class TradeFetcher:
         self.mongo_client = AsyncIOMotorClient(self.mongodb_uri)
         self.mongo_db = self.mongo_client[self.mongodb_database]
         await self.mongo_client.admin.command("ping")
-        logger.info(f"MongoDB 連接成功: {self.mongodb_database}")
+        logger.info("MongoDB 連接成功: %s", self.mongodb_database)
 
         # PostgreSQL
         await self.pg.connect()
@@ -115,7 +152,7 @@ class TradeFetcher:
         self, wallet_address: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
-        取得用戶列表
+        取得用戶列表 (僅含有錢包地址的用戶)
 
         Args:
             wallet_address: 指定錢包地址 (可選)
@@ -123,43 +160,51 @@ class TradeFetcher:
         Returns:
             用戶列表
         """
-        query = {}
         if wallet_address:
-            query["wallet_address"] = wallet_address
-
-        cursor = self.mongo_db.users.find(query)
-        users = await cursor.to_list(length=None)
-        logger.info(f"取得 {len(users)} 位用戶")
+            query = {"wallet_address": wallet_address}
+        else:
+            # 無錢包地址的用戶在查詢時即排除 ($nin null 同時排除欄位不存在)
+            query = {"wallet_address": {"$nin": [None, ""]}}
+
+        cursor = self.mongo_db.users.find(
+            query, projection=USER_PROJECTION
+        ).batch_size(USER_BATCH_SIZE)
+        users = [user async for user in cursor]
+        logger.info("取得 %d 位用戶", len(users))
         return users
 
-    async def fetch_hyperliquid_for_user(self, user: Dict[str, Any]) -> int:
+    async def fetch_hyperliquid_for_user(
+        self,
+        user: Dict[str, Any],
+        status_map: Dict[tuple, Dict[str, Any]],
+    ) -> int:
         """
         為指定用戶抓取 Hyperliquid 交易紀錄
 
         Args:
             user: 用戶資料
+            status_map: 預先取得的抓取狀態 {(wallet_address, platform): 狀態}
 
         Returns:
-            新增的交易紀錄數
+            抓取到的交易紀錄數 (寫入緩衝，於 flush 時寫入 PostgreSQL)
         """
         wallet_address = user.get("wallet_address")
         if not wallet_address:
-            logger.warning(f"用戶 {user.get('_id')} 無錢包地址，跳過 Hyperliquid")
             return 0
 
         try:
             # 取得上次抓取狀態
-            status = await self.pg.get_fetch_status(wallet_address, "hyperliquid")
+            status = status_map.get((wallet_address, "hyperliquid"))
 
             if status and status.get("last_fetch_time"):
                 start_time = status["last_fetch_time"]
                 logger.info(
-                    f"[Hyperliquid] 增量抓取 {wallet_address[:10]}... 從 {start_time}"
+                    "[Hyperliquid] 增量抓取 %.10s... 從 %s", wallet_address, start_time,
                 )
             else:
                 start_time = DEFAULT_START_DATE
                 logger.info(
-                    f"[Hyperliquid] 首次抓取 {wallet_address[:10]}... 從 {start_time}"
+                    "[Hyperliquid] 首次抓取 %.10s... 從 %s", wallet_address, start_time,
                 )
 
             # 抓取交易
@@ -170,41 +215,37 @@ class TradeFetcher:
             )
 
             if not trades:
-                logger.info(f"[Hyperliquid] {wallet_address[:10]}... 無新交易")
+                logger.info("[Hyperliquid] %.10s... 無新交易", wallet_address)
                 return 0
 
-            # 寫入 PostgreSQL
-            inserted = await self.pg.upsert_hyperliquid_trades(trades)
-
-            # 更新抓取狀態
-            latest_time = max(t["executed_at"] for t in trades)
-            await self.pg.upsert_fetch_status(
-                wallet_address=wallet_address,
-                platform="hyperliquid",
-                last_fetch_time=latest_time,
-                total_trades_fetched=inserted,
-            )
+            # 加入寫入緩衝 (抓取狀態於 flush 時與交易在同一個 transaction 中更新)
+            await self._buffer_trades("hyperliquid", wallet_address, trades)
 
             logger.info(
-                f"[Hyperliquid] {wallet_address[:10]}... 完成，新增 {inserted}/{len(trades)} 筆"
+                "[Hyperliquid] %.10s... 完成，抓取 %d 筆", wallet_address, len(trades),
             )
-            return inserted
+            return len(trades)
 
         except Exception as e:
-            logger.error(f"[Hyperliquid] {wallet_address[:10]}... 錯誤: {e}")
-            await self.pg.update_fetch_error(wallet_address, "hyperliquid", str(e))
+            logger.error("[Hyperliquid] %.10s... 錯誤: %s", wallet_address, e)
+            self._record_error(wallet_address, "hyperliquid", e)
             self.stats["errors"] += 1
             return 0
 
-    async def fetch_orderly_for_user(self, user: Dict[str, Any]) -> int:
+    async def fetch_orderly_for_user(
+        self,
+        user: Dict[str, Any],
+        status_map: Dict[tuple, Dict[str, Any]],
+    ) -> int:
         """
         為指定用戶抓取 Orderly 交易紀錄
 
         Args:
             user: 用戶資料
+            status_map: 預先取得的抓取狀態 {(wallet_address, platform): 狀態}
 
         Returns:
-            新增的交易紀錄數
+            抓取到的交易紀錄數 (寫入緩衝，於 flush 時寫入 PostgreSQL)
         """
         wallet_address = user.get("wallet_address")
         orderly_key = user.get("api_key")
@@ -212,26 +253,25 @@ class TradeFetcher:
         account_id = user.get("_id")  # 使用 user_id 作為 account_id
 
         if not wallet_address:
-            logger.warning(f"用戶 {user.get('_id')} 無錢包地址，跳過 Orderly")
             return 0
 
         if not orderly_key or not orderly_secret:
-            logger.info(f"[Orderly] {wallet_address[:10]}... 無 API 憑證，跳過")
+            logger.info("[Orderly] %.10s... 無 API 憑證，跳過", wallet_address)
             return 0
 
         try:
             # 取得上次抓取狀態
-            status = await self.pg.get_fetch_status(wallet_address, "orderly")
+            status = status_map.get((wallet_address, "orderly"))
 
             if status and status.get("last_fetch_time"):
                 start_time = status["last_fetch_time"]
                 logger.info(
-                    f"[Orderly] 增量抓取 {wallet_address[:10]}... 從 {start_time}"
+                    "[Orderly] 增量抓取 %.10s... 從 %s", wallet_address, start_time,
                 )
             else:
                 start_time = DEFAULT_START_DATE
                 logger.info(
-                    f"[Orderly] 首次抓取 {wallet_address[:10]}... 從 {start_time}"
+                    "[Orderly] 首次抓取 %.10s... 從 %s", wallet_address, start_time,
                 )
 
             # 抓取交易
@@ -245,32 +285,185 @@ class TradeFetcher:
             )
 
             if not trades:
-                logger.info(f"[Orderly] {wallet_address[:10]}... 無新交易")
+                logger.info("[Orderly] %.10s... 無新交易", wallet_address)
                 return 0
 
-            # 寫入 PostgreSQL
-            inserted = await self.pg.upsert_orderly_trades(trades)
-
-            # 更新抓取狀態
-            latest_time = max(t["executed_at"] for t in trades)
-            await self.pg.upsert_fetch_status(
-                wallet_address=wallet_address,
-                platform="orderly",
-                last_fetch_time=latest_time,
-                total_trades_fetched=inserted,
-            )
+            # 加入寫入緩衝 (抓取狀態於 flush 時與交易在同一個 transaction 中更新)
+            await self._buffer_trades("orderly", wallet_address, trades)
 
             logger.info(
-                f"[Orderly] {wallet_address[:10]}... 完成，新增 {inserted}/{len(trades)} 筆"
+                "[Orderly] %.10s... 完成，抓取 %d 筆", wallet_address, len(trades),
             )
-            return inserted
+            return len(trades)
 
         except Exception as e:
-            logger.error(f"[Orderly] {wallet_address[:10]}... 錯誤: {e}")
-            await self.pg.update_fetch_error(wallet_address, "orderly", str(e))
+            logger.error("[Orderly] %.10s... 錯誤: %s", wallet_address, e)
+            self._record_error(wallet_address, "orderly", e)
             self.stats["errors"] += 1
             return 0
 
+    async def _buffer_trades(
+        self, platform: str, wallet_address: str, trades: List[Dict[str, Any]]
+    ):
+        """
+        將用戶交易加入寫入緩衝，累積達 FLUSH_THRESHOLD 筆時寫入
+
+        Args:
+            platform: 平台名稱 ("hyperliquid" / "orderly")
+            wallet_address: 錢包地址
+            trades: 交易紀錄列表
+        """
+        self._buffers[platform].extend(trades)
+        self._pending_statuses[platform].append(
+            {
+                "wallet_address": wallet_address,
+                "platform": platform,
+                "last_fetch_time": datetime.fromtimestamp(
+                    max(t["executed_at_ms"] for t in trades) / 1000, tz=timezone.utc
+                ),
+            }
+        )
+        if len(self._buffers[platform]) >= FLUSH_THRESHOLD:
+            await self._flush(platform)
+
+    async def _flush(self, platform: str):
+        """
+        將緩衝中的交易與抓取狀態一次寫入 PostgreSQL
+
+        緩衝在寫入前即交換為新的列表，寫入期間其他用戶可繼續累積。
+        抓取狀態與交易在同一個 transaction 中提交，寫入失敗時不會推進 last_fetch_time。
+        批次寫入失敗時改為逐一錢包重試，只有仍失敗的錢包記錄錯誤。
+
+        Args:
+            platform: 平台名稱 ("hyperliquid" / "orderly")
+        """
+        trades = self._buffers[platform]
+        statuses = self._pending_statuses[platform]
+        if not statuses:
+            return
+        self._buffers[platform] = []
+        self._pending_statuses[platform] = []
+
+        label = PLATFORM_LABELS[platform]
+        try:
+            inserted = await self._upserts[platform](trades, fetch_statuses=statuses)
+        except Exception as e:
+            logger.warning(
+                "[%s] 批次寫入失敗 (%d 位用戶)，改為逐一錢包寫入: %s",
+                label, len(statuses), e,
+            )
+            self.stats[f"{platform}_trades"] += await self._flush_per_wallet(
+                platform, trades, statuses
+            )
+            return
+
+        self.stats[f"{platform}_trades"] += inserted
+        logger.info(
+            "[%s] 寫入 %d 位用戶，新增 %d/%d 筆",
+            label, len(statuses), inserted, len(trades),
+        )
+
+    async def _flush_per_wallet(
+        self,
+        platform: str,
+        trades: List[Dict[str, Any]],
+        statuses: List[Dict[str, Any]],
+    ) -> int:
+        """
+        逐一錢包寫入交易與抓取狀態 (批次寫入失敗時的退路)
+
+        單一錢包的錯誤資料只會讓該錢包失敗，不影響同批其他錢包。
+
+        Args:
+            platform: 平台名稱 ("hyperliquid" / "orderly")
+            trades: 批次中的交易紀錄
+            statuses: 批次中的抓取狀態
+
+        Returns:
+            成功插入的紀錄數
+        """
+        trades_by_wallet: Dict[str, List[Dict[str, Any]]] = {}
+        for trade in trades:
+            trades_by_wallet.setdefault(trade["wallet_address"], []).append(trade)
+        statuses_by_wallet: Dict[str, List[Dict[str, Any]]] = {}
+        for status in statuses:
+            statuses_by_wallet.setdefault(status["wallet_address"], []).append(status)
+
+        label = PLATFORM_LABELS[platform]
+        inserted = 0
+        failed = 0
+        for wallet_address, wallet_statuses in statuses_by_wallet.items():
+            try:
+                inserted += await self._upserts[platform](
+                    trades_by_wallet.get(wallet_address, []),
+                    fetch_statuses=wallet_statuses,
+                )
+            except Exception as e:
+                logger.error("[%s] %.10s... 寫入失敗: %s", label, wallet_address, e)
+                self.stats["errors"] += 1
+                self._record_error(wallet_address, platform, e)
+                failed += 1
+
+        logger.info(
+            "[%s] 逐一寫入 %d 位用戶 (失敗 %d)，新增 %d/%d 筆",
+            label, len(statuses_by_wallet), failed, inserted, len(trades),
+        )
+        return inserted
+
+    def _record_error(self, wallet_address: str, platform: str, error: Exception):
+        """記錄抓取錯誤 (加入錯誤狀態緩衝，於 _flush_statuses 時批量寫入)"""
+        self._error_statuses.append(
+            {
+                "wallet_address": wallet_address,
+                "platform": platform,
+                "last_error": str(error),
+            }
+        )
+
+    async def _flush_statuses(self):
+        """將緩衝中的錯誤狀態一次寫入 fetch_status"""
+        statuses, self._error_statuses = self._error_statuses, []
+        if not statuses:
+            return
+        try:
+            await self.pg.upsert_fetch_statuses(statuses)
+        except Exception as e:
+            logger.error("寫入抓取錯誤狀態失敗 (%d 筆): %s", len(statuses), e)
+
+    async def _process_user(
+        self,
+        user: Dict[str, Any],
+        platform: Optional[str],
+        status_map: Dict[tuple, Dict[str, Any]],
+        index: int,
+        total: int,
+    ):
+        """
+        處理單一用戶 (受 semaphore 限制並行數)
+
+        Hyperliquid 與 Orderly 互不相依，同時抓取。
+
+        Args:
+            user: 用戶資料
+            platform: 指定平台 ("hyperliquid" / "orderly")
+            status_map: 預先取得的抓取狀態
+            index: 用戶序號 (日誌用)
+            total: 用戶總數 (日誌用)
+        """
+        async with self.sem:
+            wallet = user.get("wallet_address") or "N/A"
+            logger.info("[%d/%d] 處理用戶 %.10s...", index, total, wallet)
+
+            fetches = []
+            if platform is None or platform == "hyperliquid":
+                fetches.append(self.fetch_hyperliquid_for_user(user, status_map))
+            if platform is None or platform == "orderly":
+                fetches.append(self.fetch_orderly_for_user(user, status_map))
+
+            await asyncio.gather(*fetches)
+
+            self.stats["users_processed"] += 1
+
     async def run(
         self,
         platform: Optional[str] = None,
@@ -283,11 +476,11 @@ class TradeFetcher:
             platform: 指定平台 ("hyperliquid" / "orderly")
             wallet_address: 指定錢包地址
         """
-        start_time = datetime.now()
+        start_time = datetime.now(timezone.utc)
         logger.info("=" * 60)
         logger.info("開始執行交易紀錄抓取")
-        logger.info(f"平台: {platform or '全部'}")
-        logger.info(f"錢包: {wallet_address or '全部'}")
+        logger.info("平台: %s", platform or "全部")
+        logger.info("錢包: %s", wallet_address or "全部")
         logger.info("=" * 60)
 
         try:
@@ -295,38 +488,46 @@ class TradeFetcher:
 
             users = await self.get_users(wallet_address)
 
-            for i, user in enumerate(users, 1):
-                wallet = user.get("wallet_address", "N/A")
-                logger.info(f"[{i}/{len(users)}] 處理用戶 {wallet[:10]}...")
-
-                # Hyperliquid
-                if platform is None or platform == "hyperliquid":
-                    hl_count = await self.fetch_hyperliquid_for_user(user)
-                    self.stats["hyperliquid_trades"] += hl_count
-
-                # Orderly
-                if platform is None or platform == "orderly":
-                    orderly_count = await self.fetch_orderly_for_user(user)
-                    self.stats["orderly_trades"] += orderly_count
+            # 一次取得所有用戶的抓取狀態
+            status_map = await self.pg.get_fetch_statuses(
+                list({u["wallet_address"] for u in users if u.get("wallet_address")})
+            )
 
-                self.stats["users_processed"] += 1
+            total = len(users)
+            results = await asyncio.gather(
+                *(
+                    self._process_user(user, platform, status_map, i, total)
+                    for i, user in enumerate(users, 1)
+                ),
+                return_exceptions=True,
+            )
 
-                # 用戶間延遲
-                if i < len(users):
-                    await asyncio.sleep(USER_DELAY_SECONDS)
+            # fetch_*_for_user 已處理抓取錯誤；此處的例外為未預期錯誤 (含取消)，逐一記錄
+            for user, result in zip(users, results):
+                if isinstance(result, BaseException):
+                    logger.error(
+                        "處理用戶 %s 發生未預期錯誤: %r",
+                        user.get("wallet_address") or "N/A", result,
+                        exc_info=result,
+                    )
+                    self.stats["errors"] += 1
 
         finally:
+            # 寫入剩餘緩衝
+            for name in self._buffers:
+                await self._flush(name)
+            await self._flush_statuses()
             await self.disconnect()
 
         # 輸出統計
-        elapsed = (datetime.now() - start_time).total_seconds()
+        elapsed = (datetime.now(timezone.utc) - start_time).total_seconds()
         logger.info("=" * 60)
         logger.info("抓取完成")
-        logger.info(f"處理用戶數: {self.stats['users_processed']}")
-        logger.info(f"Hyperliquid 新增交易: {self.stats['hyperliquid_trades']}")
-        logger.info(f"Orderly 新增交易: {self.stats['orderly_trades']}")
-        logger.info(f"錯誤數: {self.stats['errors']}")
-        logger.info(f"執行時間: {elapsed:.2f} 秒")
+        logger.info("處理用戶數: %d", self.stats["users_processed"])
+        logger.info("Hyperliquid 新增交易: %d", self.stats["hyperliquid_trades"])
+        logger.info("Orderly 新增交易: %d", self.stats["orderly_trades"])
+        logger.info("錯誤數: %d", self.stats["errors"])
+        logger.info("執行時間: %.2f 秒", elapsed)
         logger.info("=" * 60)
 
 
@@ -435,10 +636,13 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("操作已取消")
         sys.exit(0)
     except Exception as e:
-        logger.error(f"執行失敗: {e}")
+        logger.error("執行失敗: %s", e)
         sys.exit(1)
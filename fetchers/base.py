@@ -9,6 +9,17 @@ from typing import List, Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# 日誌欄位截斷長度 (於 _log 內處理，呼叫端直接傳完整值，等級未啟用時不做切片)
+_TRUNCATED_LOG_FIELDS = {"wallet": 10, "account_id": 20}
+
+
+def _format_log_field(key: str, value: Any) -> str:
+    """格式化單一日誌欄位，過長的識別碼截斷後加上 '...'"""
+    limit = _TRUNCATED_LOG_FIELDS.get(key)
+    if limit is not None and isinstance(value, str):
+        return f"{key}={value[:limit]}..."
+    return f"{key}={value}"
+
 
 class BaseFetcher(ABC):
     """交易資料抓取器基礎類別"""
@@ -42,17 +53,35 @@ class BaseFetcher(ABC):
         """關閉連接"""
         pass
 
+    def _log(self, level: int, message: str, **kwargs):
+        """
+        記錄日誌 (該等級未啟用時不組字串)
+
+        Args:
+            level: 日誌等級
+            message: 訊息
+            **kwargs: 附加欄位，以 key=value 形式接在訊息後
+        """
+        if not logger.isEnabledFor(level):
+            return
+        if kwargs:
+            extra = " ".join(_format_log_field(k, v) for k, v in kwargs.items())
+            logger.log(level, "[%s] %s %s", self.platform_name, message, extra)
+        else:
+            logger.log(level, "[%s] %s", self.platform_name, message)
+
+    def _log_enabled(self, level: int) -> bool:
+        """檢查日誌等級是否啟用 (供熱路徑在組裝參數前判斷)"""
+        return logger.isEnabledFor(level)
+
     def _log_info(self, message: str, **kwargs):
         """記錄資訊日誌"""
-        extra = " ".join(f"{k}={v}" for k, v in kwargs.items())
-        logger.info(f"[{self.platform_name}] {message} {extra}".strip())
+        self._log(logging.INFO, message, **kwargs)
 
     def _log_error(self, message: str, **kwargs):
         """記錄錯誤日誌"""
-        extra = " ".join(f"{k}={v}" for k, v in kwargs.items())
-        logger.error(f"[{self.platform_name}] {message} {extra}".strip())
+        self._log(logging.ERROR, message, **kwargs)
 
     def _log_warning(self, message: str, **kwargs):
         """記錄警告日誌"""
-        extra = " ".join(f"{k}={v}" for k, v in kwargs.items())
-        logger.warning(f"[{self.platform_name}] {message} {extra}".strip())
+        self._log(logging.WARNING, message, **kwargs)
@@ -0,0 +1,92 @@
+"""
+各抓取器共用的 HTTP session 與回應解析
+"""
+
+import asyncio
+from typing import Any, Optional
+
+import aiohttp
+import orjson
+
+# HTTP 連線設定
+HTTP_CONNECTION_LIMIT = 100
+HTTP_CONNECTION_LIMIT_PER_HOST = 50
+HTTP_TIMEOUT_SECONDS = 30
+HTTP_KEEPALIVE_SECONDS = 60
+
+# 模組層級共用的 HTTP session (以引用計數管理，最後一個使用者釋放時關閉)
+_shared_session: Optional[aiohttp.ClientSession] = None
+_shared_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_shared_session_refs = 0
+
+
+def acquire_session() -> aiohttp.ClientSession:
+    """
+    取得模組共用的 HTTP session 並增加引用計數
+
+    session 綁定建立時的 event loop；在新的 event loop 上呼叫時重新建立。
+    每次 acquire 都需對應一次 release_session()。
+
+    Returns:
+        aiohttp ClientSession
+    """
+    global _shared_session, _shared_session_loop, _shared_session_refs
+
+    loop = asyncio.get_running_loop()
+    if (
+        _shared_session is None
+        or _shared_session.closed
+        or _shared_session_loop is not loop
+    ):
+        _shared_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=HTTP_CONNECTION_LIMIT,
+                limit_per_host=HTTP_CONNECTION_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT_SECONDS),
+        )
+        _shared_session_loop = loop
+        _shared_session_refs = 0
+
+    _shared_session_refs += 1
+    return _shared_session
+
+
+async def release_session(session: aiohttp.ClientSession):
+    """
+    釋放 acquire_session() 取得的 session，引用計數歸零時關閉
+
+    Args:
+        session: acquire_session() 回傳的 session
+    """
+    global _shared_session, _shared_session_loop, _shared_session_refs
+
+    if session is not _shared_session:
+        # 舊 event loop 上建立、已被取代的 session
+        if not session.closed:
+            await session.close()
+        return
+
+    _shared_session_refs -= 1
+    if _shared_session_refs <= 0:
+        _shared_session = None
+        _shared_session_loop = None
+        _shared_session_refs = 0
+        if not session.closed:
+            await session.close()
+
+
+async def read_json(resp: aiohttp.ClientResponse) -> Any:
+    """
+    讀取並解析 JSON 回應
+
+    直接以 bytes 交給 orjson 解析，省去 decode 成 str 與 stdlib json。
+
+    Args:
+        resp: aiohttp 回應
+
+    Returns:
+        解析後的 JSON
+    """
+    return orjson.loads(await resp.read())
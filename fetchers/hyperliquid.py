@@ -4,28 +4,107 @@ Hyperliquid 交易資料抓取器
 
 import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Any, Optional
+import random
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
 
-from hyperliquid.info import Info
+import aiohttp
+import orjson
 
 from .base import BaseFetcher
+from .http import acquire_session, read_json, release_session
 from models.trade import HyperliquidTrade
 
 logger = logging.getLogger(__name__)
 
 # 每次抓取的時間區間 (天)
 FETCH_INTERVAL_DAYS = 30
+FETCH_INTERVAL_MS = FETCH_INTERVAL_DAYS * 86_400_000
 
 # 單次回傳上限，超過則需要縮短時間區間重試
 FILLS_LIMIT = 500
 
 # 最小時間區間 (小時)，避免無限遞迴
 MIN_INTERVAL_HOURS = 1
+MIN_INTERVAL_MS = MIN_INTERVAL_HOURS * 3_600_000
+
+# 自適應區間：依已抓取區間的 fills 密度 (EMA) 調整下一批區間長度，
+# 使每個區間預期約 TARGET_FILLS_PER_INTERVAL 筆 (上限的一半，減少切分重試)
+TARGET_FILLS_PER_INTERVAL = FILLS_LIMIT // 2
+DENSITY_SMOOTHING = 0.3
 
 # 最大重試次數
 MAX_RETRIES = 3
 
+# 重試延遲 (秒)：指數退避 RETRY_BASE_DELAY * 2^attempt 加上隨機 jitter，上限 RETRY_MAX_DELAY
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_JITTER = 0.5
+RETRY_MAX_DELAY = 30.0
+
+# 同時進行的 Info API 請求上限 (整個 fetcher 共用，避免觸發 rate limit)
+MAX_CONCURRENT_REQUESTS = 5
+
+# 官方 mainnet API
+MAINNET_API_URL = "https://api.hyperliquid.xyz"
+
+# Info API 的請求 headers
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class _InflightAbandoned(Exception):
+    """進行中的區間請求被其發起者取消，等待者需自行重新請求"""
+
+
+def _period(start_ms: int, end_ms: int) -> str:
+    """將毫秒時間區間格式化為日期 (日誌用)"""
+    start = datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc).date()
+    end = datetime.fromtimestamp(end_ms / 1000, tz=timezone.utc).date()
+    return f"{start} ~ {end}"
+
+
+def _interval_span(density: Optional[float]) -> int:
+    """
+    依 fills 密度計算下一個區間長度
+
+    Args:
+        density: fills 密度 (筆/毫秒)，尚無觀測時為 None
+
+    Returns:
+        區間長度 (毫秒)，介於 MIN_INTERVAL_MS 與 FETCH_INTERVAL_MS 之間
+    """
+    if not density:
+        return FETCH_INTERVAL_MS
+    return int(
+        min(FETCH_INTERVAL_MS, max(MIN_INTERVAL_MS, TARGET_FILLS_PER_INTERVAL / density))
+    )
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """
+    計算重試延遲
+
+    指數退避加上隨機 jitter，避免並行請求同步重試；
+    遇到 429 且帶有 Retry-After (秒) 時至少等待該時間。
+
+    Args:
+        attempt: 第幾次重試 (從 0 開始)
+        error: 本次失敗的例外
+
+    Returns:
+        延遲秒數
+    """
+    delay = min(
+        RETRY_MAX_DELAY,
+        RETRY_BASE_DELAY * (2 ** attempt) + random.uniform(0, RETRY_MAX_JITTER),
+    )
+    if isinstance(error, aiohttp.ClientResponseError) and error.status == 429:
+        retry_after = (error.headers or {}).get("Retry-After")
+        try:
+            delay = max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+    return delay
+
 
 class HyperliquidFetcher(BaseFetcher):
     """Hyperliquid 交易資料抓取器"""
@@ -39,82 +118,169 @@ class HyperliquidFetcher(BaseFetcher):
         Args:
             base_url: API base URL (可選，預設使用官方 mainnet)
         """
-        self.info = Info(base_url=base_url, skip_ws=True)
+        self.base_url = (base_url or MAINNET_API_URL).rstrip("/")
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._request_sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        # 進行中的區間請求 {(wallet, start_ts, end_ts): Future}，相同區間的並行呼叫共用結果
+        self._inflight: Dict[Tuple[str, int, int], asyncio.Future] = {}
         self._log_info("Hyperliquid fetcher initialized")
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        取得模組共用的 HTTP session (首次使用時 acquire，close() 時 release)
+
+        Returns:
+            aiohttp ClientSession
+        """
+        if self._session is None:
+            self._session = acquire_session()
+        return self._session
+
+    async def _post_info(self, payload: Dict[str, Any]) -> Any:
+        """
+        呼叫 Info API
+
+        Args:
+            payload: request body
+
+        Returns:
+            解析後的 JSON 回應
+        """
+        async with self._request_sem:
+            async with self._get_session().post(
+                f"{self.base_url}/info",
+                data=orjson.dumps(payload),
+                headers=JSON_HEADERS,
+            ) as resp:
+                resp.raise_for_status()
+                return await read_json(resp)
+
     async def _fetch_fills_for_interval(
         self,
         wallet_address: str,
-        interval_start: datetime,
-        interval_end: datetime,
+        start_ts: int,
+        end_ts: int,
     ) -> List[Dict[str, Any]]:
         """
-        抓取單一時間區間的 fills，若回傳量達上限則自動切分區間重試
+        抓取單一時間區間的 fills，同一區間已有進行中的請求時直接等待其結果
 
         Args:
             wallet_address: 錢包地址
-            interval_start: 區間開始時間 (UTC)
-            interval_end: 區間結束時間 (UTC)
+            start_ts: 區間開始時間 (Unix 毫秒)
+            end_ts: 區間結束時間 (Unix 毫秒)
 
         Returns:
-            fills 列表 (raw API response dicts)
+            fills 列表 (raw API response dicts，與其他等待者共用，請勿修改)
+        """
+        key = (wallet_address, start_ts, end_ts)
+        inflight = self._inflight.get(key)
+        while inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except _InflightAbandoned:
+                # 發起者被取消 (本呼叫端並未被取消)，改由自己或其他等待者重新請求
+                inflight = self._inflight.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            fills = await self._load_fills_for_interval(
+                wallet_address, start_ts, end_ts
+            )
+        except asyncio.CancelledError:
+            # 不可 cancel 共用的 future，否則未被取消的等待者也會收到 CancelledError
+            future.set_exception(_InflightAbandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 已由本呼叫端處理，避免沒有其他等待者時出現 "never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(fills)
+            return fills
+        finally:
+            del self._inflight[key]
+
+    async def _load_fills_for_interval(
+        self,
+        wallet_address: str,
+        start_ts: int,
+        end_ts: int,
+    ) -> List[Dict[str, Any]]:
         """
-        start_ts = int(interval_start.timestamp() * 1000)
-        end_ts = int(interval_end.timestamp() * 1000)
+        實際抓取單一時間區間的 fills，若回傳量達上限則自動切分區間重試
 
-        loop = asyncio.get_running_loop()
+        Args:
+            wallet_address: 錢包地址
+            start_ts: 區間開始時間 (Unix 毫秒)
+            end_ts: 區間結束時間 (Unix 毫秒)
+
+        Returns:
+            fills 列表 (raw API response dicts)
+
+        Raises:
+            Exception: 達最大重試次數仍失敗時拋出最後一次的錯誤，
+                避免呼叫端把缺漏的區間當成已抓取而推進 last_fetch_time
+        """
+        payload = {
+            "type": "userFillsByTime",
+            "user": wallet_address,
+            "startTime": start_ts,
+            "endTime": end_ts,
+        }
 
         for attempt in range(MAX_RETRIES):
             try:
-                fills = await loop.run_in_executor(
-                    None,
-                    lambda s=start_ts, e=end_ts: self.info.user_fills_by_time(
-                        wallet_address, s, e
-                    ),
-                )
+                fills = await self._post_info(payload)
                 break
             except Exception as e:
                 if attempt < MAX_RETRIES - 1:
                     self._log_warning(
-                        f"抓取失敗，重試 {attempt + 1}/{MAX_RETRIES}",
-                        wallet=wallet_address[:10] + "...",
-                        error=str(e),
+                        "抓取失敗，重試",
+                        attempt=attempt + 1,
+                        max_retries=MAX_RETRIES,
+                        wallet=wallet_address,
+                        error=e,
                     )
-                    await asyncio.sleep(1 * (attempt + 1))
+                    await asyncio.sleep(_retry_delay(attempt, e))
                 else:
                     self._log_error(
-                        f"抓取失敗，已達最大重試次數",
-                        wallet=wallet_address[:10] + "...",
-                        period=f"{interval_start.date()} ~ {interval_end.date()}",
-                        error=str(e),
+                        "抓取失敗，已達最大重試次數",
+                        wallet=wallet_address,
+                        period=_period(start_ts, end_ts),
+                        error=e,
                     )
-                    return []
+                    raise
 
         if not fills:
             return []
 
         # 若回傳量達上限且區間仍可切分，則遞迴切分
         if len(fills) >= FILLS_LIMIT:
-            interval_hours = (interval_end - interval_start).total_seconds() / 3600
-            if interval_hours > MIN_INTERVAL_HOURS:
-                mid = interval_start + (interval_end - interval_start) / 2
-                self._log_info(
-                    f"回傳量達上限 ({len(fills)})，切分區間重試",
-                    wallet=wallet_address[:10] + "...",
-                    period=f"{interval_start.date()} ~ {interval_end.date()}",
-                )
+            if end_ts - start_ts > MIN_INTERVAL_MS:
+                mid = start_ts + (end_ts - start_ts) // 2
+                if self._log_enabled(logging.INFO):
+                    self._log_info(
+                        "回傳量達上限，切分區間重試",
+                        wallet=wallet_address,
+                        period=_period(start_ts, end_ts),
+                        count=len(fills),
+                    )
                 first_half = await self._fetch_fills_for_interval(
-                    wallet_address, interval_start, mid
+                    wallet_address, start_ts, mid
                 )
                 await asyncio.sleep(0.2)
                 second_half = await self._fetch_fills_for_interval(
-                    wallet_address, mid, interval_end
+                    wallet_address, mid, end_ts
                 )
                 return first_half + second_half
             else:
                 self._log_warning(
-                    f"區間已達最小值仍有 {len(fills)} 筆，可能有遺漏",
-                    wallet=wallet_address[:10] + "...",
+                    "區間已達最小值仍達上限，可能有遺漏",
+                    wallet=wallet_address,
+                    count=len(fills),
                 )
 
         return fills
@@ -129,7 +295,9 @@ class HyperliquidFetcher(BaseFetcher):
         """
         抓取指定時間範圍內的交易紀錄
 
-        使用時間分段方式抓取，若單一區間回傳量達上限則自動切分重試
+        使用時間分段方式抓取：每輪並行請求 MAX_CONCURRENT_REQUESTS 個區間，
+        並依已抓取的 fills 密度調整下一輪的區間長度；
+        若單一區間回傳量達上限則自動切分重試
 
         Args:
             wallet_address: 錢包地址
@@ -138,47 +306,72 @@ class HyperliquidFetcher(BaseFetcher):
 
         Returns:
             交易紀錄列表 (已轉換為統一格式)
+
+        Raises:
+            Exception: 任一區間達最大重試次數仍失敗時拋出
         """
         all_trades: List[Dict[str, Any]] = []
-        current_start = start_time
 
         self._log_info(
-            f"開始抓取交易",
-            wallet=wallet_address[:10] + "...",
+            "開始抓取交易",
+            wallet=wallet_address,
             start=start_time.isoformat(),
             end=end_time.isoformat(),
         )
 
-        while current_start < end_time:
-            current_end = min(
-                current_start + timedelta(days=FETCH_INTERVAL_DAYS),
-                end_time,
-            )
-
-            fills = await self._fetch_fills_for_interval(
-                wallet_address, current_start, current_end
+        # 區間邊界以整數毫秒計算，只在開頭轉換一次 datetime
+        cur = int(start_time.timestamp() * 1000)
+        end_ms = int(end_time.timestamp() * 1000)
+        density: Optional[float] = None
+        # 區間邊界與切分區間可能回傳相同的 fill，依 tid 去重後再寫入
+        seen_tids: set = set()
+
+        while cur < end_ms:
+            span = _interval_span(density)
+            intervals = []
+            while cur < end_ms and len(intervals) < MAX_CONCURRENT_REQUESTS:
+                nxt = min(cur + span, end_ms)
+                intervals.append((cur, nxt))
+                cur = nxt
+
+            # 等整輪請求結束再檢查錯誤，避免失敗後其餘區間仍在背景執行
+            results = await asyncio.gather(
+                *(
+                    self._fetch_fills_for_interval(wallet_address, start, end)
+                    for start, end in intervals
+                ),
+                return_exceptions=True,
             )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+
+            for (interval_start, interval_end), fills in zip(intervals, results):
+                observed = len(fills) / (interval_end - interval_start)
+                density = (
+                    observed
+                    if density is None
+                    else (1 - DENSITY_SMOOTHING) * density + DENSITY_SMOOTHING * observed
+                )
 
-            if fills:
-                for fill in fills:
-                    trade = HyperliquidTrade.from_api_response(
-                        wallet_address, fill
-                    )
-                    all_trades.append(trade.to_dict())
+                if not fills:
+                    continue
 
-                self._log_info(
-                    f"抓取成功",
-                    wallet=wallet_address[:10] + "...",
-                    period=f"{current_start.date()} ~ {current_end.date()}",
-                    count=len(fills),
+                all_trades.extend(
+                    HyperliquidTrade.bulk_from_api(wallet_address, fills, seen_tids)
                 )
 
-            current_start = current_end
-            await asyncio.sleep(0.2)
+                if self._log_enabled(logging.INFO):
+                    self._log_info(
+                        "抓取成功",
+                        wallet=wallet_address,
+                        period=_period(interval_start, interval_end),
+                        count=len(fills),
+                    )
 
         self._log_info(
-            f"完成抓取",
-            wallet=wallet_address[:10] + "...",
+            "完成抓取",
+            wallet=wallet_address,
             total=len(all_trades),
         )
 
@@ -210,5 +403,7 @@ class HyperliquidFetcher(BaseFetcher):
 
     async def close(self):
         """關閉連接"""
-        # hyperliquid SDK 沒有需要關閉的資源
+        if self._session is not None:
+            await release_session(self._session)
+        self._session = None
         self._log_info("Hyperliquid fetcher closed")
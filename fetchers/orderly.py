@@ -3,13 +3,19 @@ Orderly 交易資料抓取器
 """
 
 import asyncio
+import base64
 import logging
+import time
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Mapping, Optional
+from urllib.parse import urlencode
 
-from orderly_evm_connector.rest import Rest
+import aiohttp
+import base58
+from nacl.signing import SigningKey
 
 from .base import BaseFetcher
+from .http import acquire_session, read_json, release_session
 from models.trade import OrderlyTrade
 
 logger = logging.getLogger(__name__)
@@ -17,23 +23,262 @@ logger = logging.getLogger(__name__)
 # 每頁抓取數量 (Orderly 最大 500)
 PAGE_SIZE = 500
 
+# 第一頁已滿時，之後每輪並行請求的頁數 (遇到不滿一頁即停止，多抓的頁直接捨棄)
+PAGE_WINDOW = 8
+
+# 同時進行的 API 請求上限 (整個 fetcher 共用，避免觸發 rate limit)
+MAX_CONCURRENT_REQUESTS = 8
+
+# 官方 mainnet API
+MAINNET_API_URL = "https://api-evm.orderly.org"
+
+# 遇到 429 時的最大重試次數與退避上限 (秒)
+MAX_RETRIES = 5
+RETRY_MAX_DELAY = 30.0
+
+
+def _parse_rows(response: Any) -> List[Dict[str, Any]]:
+    """
+    從 API 回應取出交易列表
+
+    Orderly API 回傳格式可能是:
+    {"success": true, "data": {"rows": [...], "meta": {...}}}
+    或直接是 {"rows": [...]}
+
+    Args:
+        response: API 回應
+
+    Returns:
+        交易列表 (raw API response dicts)
+    """
+    if isinstance(response, list):
+        return response
+    if isinstance(response, dict):
+        if "data" in response:
+            data = response["data"]
+            if isinstance(data, dict) and "rows" in data:
+                return data["rows"]
+            if isinstance(data, list):
+                return data
+        elif "rows" in response:
+            return response["rows"]
+    return []
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    """讀取數值型 header，不存在或無法解析時回傳 None"""
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """
+    依 API 回應 headers 節流
+
+    有剩餘額度時請求不等待，並在本地先扣除額度，讓並行請求不會依同一個過期的
+    剩餘值一起放行；額度用盡 (X-RateLimit-Remaining 為 0) 或遇到 429 時，
+    等到 reset 時間後才放行下一個請求。
+    """
+
+    def __init__(self):
+        self.remaining: Optional[float] = None
+        self.reset_at = 0.0  # time.monotonic()
+
+    async def acquire(self):
+        """送出請求前呼叫，已知剩餘額度時扣除一次，額度用盡時等待至 reset"""
+        while self.remaining is not None:
+            if self.remaining > 0:
+                self.remaining -= 1
+                return
+            delay = self.reset_at - time.monotonic()
+            if delay <= 0:
+                # 已過 reset 時間，額度未知，待下一個回應更新
+                self.remaining = None
+                return
+            await asyncio.sleep(delay)
+
+    def update(self, headers: Mapping[str, str]):
+        """
+        依回應 headers 更新剩餘額度與 reset 時間
+
+        X-RateLimit-Reset 可能是秒數、Unix 秒或 Unix 毫秒，皆換算為距今秒數。
+        """
+        remaining = _header_number(headers, "X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        self.remaining = remaining
+
+        reset = _header_number(headers, "X-RateLimit-Reset")
+        if reset is None:
+            reset = 1.0
+        elif reset > 1e12:
+            reset = reset / 1000 - time.time()
+        elif reset > 1e9:
+            reset = reset - time.time()
+        self.reset_at = time.monotonic() + max(reset, 0.0)
+
+    def block(self, seconds: float):
+        """暫停放行請求 (用於 429)"""
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, time.monotonic() + seconds)
+
+
+class OrderlyRestAsync:
+    """
+    Orderly REST API 非同步 client (單一帳戶)
+
+    以 ed25519 簽署請求，簽署內容為 timestamp + method + path (含 query) + body，
+    HTTP session 由呼叫端提供，多個帳戶共用。
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        orderly_key: str,
+        orderly_secret: str,
+        account_id: str,
+        base_url: str = MAINNET_API_URL,
+    ):
+        """
+        初始化 client
+
+        Args:
+            session: 共用的 HTTP session
+            orderly_key: Orderly API key ("ed25519:..." 公鑰)
+            orderly_secret: Orderly API secret ("ed25519:..." base58 私鑰)
+            account_id: Orderly account ID
+            base_url: API base URL
+        """
+        self.session = session
+        self.orderly_key = orderly_key
+        self.account_id = account_id
+        self.base_url = base_url.rstrip("/")
+        # Orderly 的 rate limit 以 API key 計算，每個帳戶各自節流
+        self.limiter = RateLimiter()
+
+        secret = orderly_secret
+        if secret.startswith("ed25519:"):
+            secret = secret[len("ed25519:"):]
+        # 私鑰只解析一次，之後每個請求直接簽署
+        self._signing_key = SigningKey(base58.b58decode(secret))
+
+        # 帳戶固定的 headers，每個請求只需補上 timestamp 與簽章
+        self._base_headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "orderly-account-id": account_id,
+            "orderly-key": orderly_key,
+        }
+
+    def _headers(self, method: str, path: str, body: str = "") -> Dict[str, str]:
+        """
+        產生簽署後的請求 headers
+
+        Args:
+            method: HTTP method
+            path: 請求路徑 (含 query string)
+            body: 請求 body
+
+        Returns:
+            headers
+        """
+        timestamp = str(int(time.time() * 1000))
+        message = f"{timestamp}{method}{path}{body}".encode()
+        signature = self._signing_key.sign(message).signature
+
+        headers = self._base_headers.copy()
+        headers["orderly-timestamp"] = timestamp
+        headers["orderly-signature"] = base64.urlsafe_b64encode(signature).decode()
+        return headers
+
+    async def get_trades(
+        self,
+        start_t: int,
+        end_t: int,
+        page: int = 1,
+        size: int = PAGE_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        取得帳戶成交紀錄 (GET /v1/trades)
+
+        Args:
+            start_t: 開始時間 (Unix 毫秒)
+            end_t: 結束時間 (Unix 毫秒)
+            page: 頁碼 (從 1 開始)
+            size: 每頁筆數
+
+        Returns:
+            API 回應
+        """
+        query = urlencode(
+            {"start_t": start_t, "end_t": end_t, "page": page, "size": size}
+        )
+        path = f"/v1/trades?{query}"
+
+        for attempt in range(MAX_RETRIES):
+            await self.limiter.acquire()
+            async with self.session.get(
+                self.base_url + path, headers=self._headers("GET", path)
+            ) as resp:
+                self.limiter.update(resp.headers)
+                if resp.status == 429 and attempt < MAX_RETRIES - 1:
+                    # 指數退避，若有 Retry-After 則至少等待該時間
+                    delay = min(2 ** attempt, RETRY_MAX_DELAY)
+                    retry_after = _header_number(resp.headers, "Retry-After")
+                    if retry_after is not None:
+                        delay = max(delay, retry_after)
+                    self.limiter.block(delay)
+                    continue
+                resp.raise_for_status()
+                response = await read_json(resp)
+                break
+
+        if isinstance(response, dict) and response.get("success") is False:
+            raise RuntimeError(
+                f"Orderly API 錯誤: {response.get('code')} {response.get('message')}"
+            )
+        return response
+
 
 class OrderlyFetcher(BaseFetcher):
     """Orderly 交易資料抓取器"""
 
     platform_name = "orderly"
 
-    def __init__(self):
-        """初始化 Orderly 抓取器"""
-        self._clients: Dict[str, Rest] = {}
+    def __init__(self, base_url: Optional[str] = None):
+        """
+        初始化 Orderly 抓取器
+
+        Args:
+            base_url: API base URL (可選，預設使用官方 mainnet)
+        """
+        self.base_url = base_url or MAINNET_API_URL
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._clients: Dict[str, OrderlyRestAsync] = {}
+        self._request_sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
         self._log_info("Orderly fetcher initialized")
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        取得模組共用的 HTTP session (首次使用時 acquire，close() 時 release)
+
+        Returns:
+            aiohttp ClientSession
+        """
+        if self._session is None:
+            self._session = acquire_session()
+        return self._session
+
     def _get_client(
         self,
         orderly_key: str,
         orderly_secret: str,
         account_id: str,
-    ) -> Rest:
+    ) -> OrderlyRestAsync:
         """
         取得或建立 REST client
 
@@ -43,19 +288,49 @@ class OrderlyFetcher(BaseFetcher):
             account_id: Orderly account ID
 
         Returns:
-            Rest client instance
+            OrderlyRestAsync instance
         """
         cache_key = f"{account_id}"
 
         if cache_key not in self._clients:
-            self._clients[cache_key] = Rest(
+            self._clients[cache_key] = OrderlyRestAsync(
+                session=self._get_session(),
                 orderly_key=orderly_key,
                 orderly_secret=orderly_secret,
-                orderly_account_id=account_id,
+                account_id=account_id,
+                base_url=self.base_url,
             )
 
         return self._clients[cache_key]
 
+    async def _fetch_page(
+        self,
+        client: OrderlyRestAsync,
+        start_ts: int,
+        end_ts: int,
+        page: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        抓取單一頁交易 (受 MAX_CONCURRENT_REQUESTS 限制)
+
+        Args:
+            client: REST client
+            start_ts: 開始時間 (Unix 毫秒)
+            end_ts: 結束時間 (Unix 毫秒)
+            page: 頁碼 (從 1 開始)
+
+        Returns:
+            該頁交易列表 (raw API response dicts)
+        """
+        async with self._request_sem:
+            response = await client.get_trades(
+                start_t=start_ts,
+                end_t=end_ts,
+                page=page,
+                size=PAGE_SIZE,
+            )
+        return _parse_rows(response)
+
     async def fetch_trades(
         self,
         wallet_address: str,
@@ -66,7 +341,8 @@ class OrderlyFetcher(BaseFetcher):
         """
         抓取指定時間範圍內的交易紀錄
 
-        使用分頁方式抓取所有資料
+        使用分頁方式抓取所有資料：先抓第一頁，若已滿則每輪並行請求 PAGE_WINDOW 頁，
+        直到出現不滿一頁或空頁為止
 
         Args:
             wallet_address: 錢包地址
@@ -79,6 +355,9 @@ class OrderlyFetcher(BaseFetcher):
 
         Returns:
             交易紀錄列表 (已轉換為統一格式)
+
+        Raises:
+            Exception: 任一頁抓取失敗時拋出該頁的錯誤
         """
         orderly_key = kwargs.get("orderly_key")
         orderly_secret = kwargs.get("orderly_secret")
@@ -87,7 +366,7 @@ class OrderlyFetcher(BaseFetcher):
         if not all([orderly_key, orderly_secret, account_id]):
             self._log_error(
                 "缺少 Orderly API 憑證",
-                wallet=wallet_address[:10] + "...",
+                wallet=wallet_address,
             )
             return []
 
@@ -101,86 +380,67 @@ class OrderlyFetcher(BaseFetcher):
         end_ts = int(end_time.timestamp() * 1000)
 
         self._log_info(
-            f"開始抓取交易",
-            wallet=wallet_address[:10] + "...",
-            account_id=account_id[:20] + "...",
+            "開始抓取交易",
+            wallet=wallet_address,
+            account_id=account_id,
             start=start_time.isoformat(),
             end=end_time.isoformat(),
         )
 
-        while True:
-            try:
-                loop = asyncio.get_running_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: client.get_trades(
-                        start_t=start_ts,
-                        end_t=end_ts,
-                        page=page,
-                        size=PAGE_SIZE,
-                    ),
-                )
+        window = 1
+        done = False
+        while not done:
+            pages = range(page, page + window)
+            results = await asyncio.gather(
+                *(self._fetch_page(client, start_ts, end_ts, p) for p in pages),
+                return_exceptions=True,
+            )
 
-                # 解析回應
-                # Orderly API 回傳格式可能是:
-                # {"success": true, "data": {"rows": [...], "meta": {...}}}
-                # 或直接是 {"rows": [...]}
-                trades_data = []
-                if isinstance(response, dict):
-                    if "data" in response:
-                        data = response["data"]
-                        if isinstance(data, dict) and "rows" in data:
-                            trades_data = data["rows"]
-                        elif isinstance(data, list):
-                            trades_data = data
-                    elif "rows" in response:
-                        trades_data = response["rows"]
-                    elif isinstance(response, list):
-                        trades_data = response
+            # 依頁碼順序處理，遇到空頁或不滿一頁即停止，之後的頁捨棄；
+            # 任一頁失敗則整個錢包視為失敗，避免以不完整的結果推進 last_fetch_time
+            for p, trades_data in zip(pages, results):
+                if isinstance(trades_data, BaseException):
+                    self._log_error(
+                        "抓取失敗",
+                        wallet=wallet_address,
+                        page=p,
+                        error=trades_data,
+                    )
+                    raise trades_data
 
                 if not trades_data:
                     self._log_info(
-                        f"無更多資料",
-                        wallet=wallet_address[:10] + "...",
-                        page=page,
+                        "無更多資料",
+                        wallet=wallet_address,
+                        page=p,
                     )
+                    done = True
                     break
 
                 # 轉換為統一格式
-                for trade_data in trades_data:
-                    trade = OrderlyTrade.from_api_response(
-                        wallet_address, account_id, trade_data
-                    )
-                    all_trades.append(trade.to_dict())
-
-                self._log_info(
-                    f"抓取成功",
-                    wallet=wallet_address[:10] + "...",
-                    page=page,
-                    count=len(trades_data),
+                all_trades.extend(
+                    OrderlyTrade.bulk_from_api(wallet_address, account_id, trades_data)
                 )
 
+                if self._log_enabled(logging.INFO):
+                    self._log_info(
+                        "抓取成功",
+                        wallet=wallet_address,
+                        page=p,
+                        count=len(trades_data),
+                    )
+
                 # 如果返回的資料量小於頁面大小，表示已經沒有更多資料
                 if len(trades_data) < PAGE_SIZE:
+                    done = True
                     break
 
-                page += 1
-
-                # Rate limit 保護
-                await asyncio.sleep(0.3)
-
-            except Exception as e:
-                self._log_error(
-                    f"抓取失敗",
-                    wallet=wallet_address[:10] + "...",
-                    page=page,
-                    error=str(e),
-                )
-                break
+            page += window
+            window = PAGE_WINDOW
 
         self._log_info(
-            f"完成抓取",
-            wallet=wallet_address[:10] + "...",
+            "完成抓取",
+            wallet=wallet_address,
             total=len(all_trades),
         )
 
@@ -222,4 +482,7 @@ class OrderlyFetcher(BaseFetcher):
     async def close(self):
         """關閉連接"""
         self._clients.clear()
+        if self._session is not None:
+            await release_session(self._session)
+        self._session = None
         self._log_info("Orderly fetcher closed")
@@ -1,11 +1,19 @@
 """
 Trade dataclass 定義
+
+數值欄位 (價格、數量、手續費、盈虧、倉位) 保留為十進位字串，不在抓取時建立 Decimal；
+寫入 PostgreSQL 時由 asyncpg 依 DECIMAL 欄位型別轉換，需要運算時再自行 Decimal(value)。
+成交時間保留 API 的 Unix 毫秒 (executed_at_ms)，datetime 於寫入資料庫時才轉換，
+物件上可透過 executed_at property 取得。
 """
 
+import time
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone
-from decimal import Decimal
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Iterable, Set
+
+# Hyperliquid side 代碼: "B"=買, "A"=賣
+_HL_SIDES = {"B": "BUY", "A": "SELL"}
 
 
 @dataclass
@@ -16,19 +24,24 @@ class HyperliquidTrade:
     trade_id: int
     symbol: str
     side: str  # "BUY" / "SELL"
-    price: Decimal
-    quantity: Decimal
-    executed_at: datetime
+    price: str
+    quantity: str
+    executed_at_ms: int  # Unix 時間戳 (毫秒)
 
     # Optional fields
     tx_hash: Optional[str] = None
     order_id: Optional[int] = None
     direction: Optional[str] = None  # "LONG" / "SHORT"
-    fee: Optional[Decimal] = None
+    fee: Optional[str] = None
     fee_token: Optional[str] = None
-    realized_pnl: Optional[Decimal] = None
+    realized_pnl: Optional[str] = None
     is_taker: Optional[bool] = None
-    position_before: Optional[Decimal] = None
+    position_before: Optional[str] = None
+
+    @property
+    def executed_at(self) -> datetime:
+        """成交時間 (UTC)"""
+        return datetime.fromtimestamp(self.executed_at_ms / 1000, tz=timezone.utc)
 
     def to_dict(self) -> Dict[str, Any]:
         """轉換為字典"""
@@ -66,10 +79,6 @@ class HyperliquidTrade:
         raw_dir = data.get("dir", "")
         direction = raw_dir if raw_dir else None
 
-        # 轉換時間戳 (毫秒 -> datetime, UTC)
-        time_ms = data.get("time", 0)
-        executed_at = datetime.fromtimestamp(time_ms / 1000, tz=timezone.utc)
-
         return cls(
             wallet_address=wallet_address,
             trade_id=data.get("tid", 0),
@@ -78,16 +87,72 @@ class HyperliquidTrade:
             order_id=data.get("oid"),
             side=side,
             direction=direction,
-            price=Decimal(str(data.get("px", "0"))),
-            quantity=Decimal(str(data.get("sz", "0"))),
-            fee=Decimal(str(data.get("fee", "0"))) if data.get("fee") else None,
+            price=str(data.get("px", "0")),
+            quantity=str(data.get("sz", "0")),
+            fee=str(data.get("fee", "0")) if data.get("fee") else None,
             fee_token=data.get("feeToken"),
-            realized_pnl=Decimal(str(data.get("closedPnl", "0"))) if data.get("closedPnl") else None,
+            realized_pnl=str(data.get("closedPnl", "0")) if data.get("closedPnl") else None,
             is_taker=data.get("crossed"),
-            position_before=Decimal(str(data.get("startPosition", "0"))) if data.get("startPosition") else None,
-            executed_at=executed_at,
+            position_before=str(data.get("startPosition", "0")) if data.get("startPosition") else None,
+            executed_at_ms=data.get("time", 0),
         )
 
+    @classmethod
+    def bulk_from_api(
+        cls,
+        wallet_address: str,
+        fills: Iterable[Dict[str, Any]],
+        seen: Optional[Set[int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        批量將 Hyperliquid API fills 直接轉換為字典
+
+        結果與 from_api_response(...).to_dict() 相同，但不建立中間物件，
+        也不經過 asdict 的深層複製，適合大量 fills。
+
+        Args:
+            wallet_address: 錢包地址
+            fills: API 回傳的 fills
+            seen: 已處理的 trade_id (tid) 集合 (可選)；提供時略過重複的 fills
+                並將新的 tid 加入集合，可跨多次呼叫去重
+
+        Returns:
+            交易紀錄字典列表
+        """
+        sides = _HL_SIDES
+
+        trades = []
+        append = trades.append
+        for data in fills:
+            get = data.get
+            trade_id = get("tid", 0)
+            if seen is not None:
+                if trade_id in seen:
+                    continue
+                seen.add(trade_id)
+            raw_side = get("side", "")
+            fee = get("fee")
+            closed_pnl = get("closedPnl")
+            start_position = get("startPosition")
+            append({
+                "wallet_address": wallet_address,
+                "trade_id": trade_id,
+                "symbol": get("coin", ""),
+                "side": sides.get(raw_side, raw_side),
+                "price": str(get("px", "0")),
+                "quantity": str(get("sz", "0")),
+                "executed_at_ms": get("time", 0),
+                "tx_hash": get("hash"),
+                "order_id": get("oid"),
+                "direction": get("dir") or None,
+                "fee": str(fee) if fee else None,
+                "fee_token": get("feeToken"),
+                "realized_pnl": str(closed_pnl) if closed_pnl else None,
+                "is_taker": get("crossed"),
+                "position_before": str(start_position) if start_position else None,
+            })
+        return trades
+
 
 @dataclass
 class OrderlyTrade:
@@ -98,17 +163,22 @@ class OrderlyTrade:
     trade_id: int
     symbol: str
     side: str  # "BUY" / "SELL"
-    price: Decimal
-    quantity: Decimal
-    executed_at: datetime
+    price: str
+    quantity: str
+    executed_at_ms: int  # Unix 時間戳 (毫秒)
 
     # Optional fields
     order_id: Optional[int] = None
-    fee: Optional[Decimal] = None
+    fee: Optional[str] = None
     fee_token: Optional[str] = None
-    realized_pnl: Optional[Decimal] = None
+    realized_pnl: Optional[str] = None
     is_taker: Optional[bool] = None
 
+    @property
+    def executed_at(self) -> datetime:
+        """成交時間 (UTC)"""
+        return datetime.fromtimestamp(self.executed_at_ms / 1000, tz=timezone.utc)
+
     def to_dict(self) -> Dict[str, Any]:
         """轉換為字典"""
         return asdict(self)
@@ -136,9 +206,8 @@ class OrderlyTrade:
             "trade_id": int,        # 交易 ID (唯一)
         }
         """
-        # 轉換時間戳 (毫秒 -> datetime, UTC)
-        time_ms = data.get("created_time") or data.get("timestamp", 0)
-        executed_at = datetime.fromtimestamp(time_ms / 1000, tz=timezone.utc) if time_ms else datetime.now(timezone.utc)
+        # 時間戳 (毫秒)，缺少時以目前時間代替
+        time_ms = data.get("created_time") or data.get("timestamp") or int(time.time() * 1000)
 
         # 確定交易 ID
         trade_id = data.get("trade_id") or data.get("id", 0)
@@ -157,11 +226,55 @@ class OrderlyTrade:
             symbol=data.get("symbol", ""),
             order_id=data.get("order_id"),
             side=side,
-            price=Decimal(str(data.get("executed_price", 0))),
-            quantity=Decimal(str(data.get("executed_quantity", 0))),
-            fee=Decimal(str(data.get("fee", 0))) if data.get("fee") is not None else None,
+            price=str(data.get("executed_price", 0)),
+            quantity=str(data.get("executed_quantity", 0)),
+            fee=str(data.get("fee", 0)) if data.get("fee") is not None else None,
             fee_token=data.get("fee_asset"),
-            realized_pnl=Decimal(str(data.get("realized_pnl", 0))) if data.get("realized_pnl") is not None else None,
+            realized_pnl=str(data.get("realized_pnl", 0)) if data.get("realized_pnl") is not None else None,
             is_taker=is_taker,
-            executed_at=executed_at,
+            executed_at_ms=time_ms,
         )
+
+    @classmethod
+    def bulk_from_api(
+        cls, wallet_address: str, account_id: str, rows: Iterable[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        批量將 Orderly API 交易列表直接轉換為字典
+
+        結果與 from_api_response(...).to_dict() 相同，但不建立中間物件，
+        也不經過 asdict 的深層複製。
+
+        Args:
+            wallet_address: 錢包地址
+            account_id: Orderly account ID
+            rows: API 回傳的交易列表
+
+        Returns:
+            交易紀錄字典列表
+        """
+        now_ms = int(time.time() * 1000)
+
+        trades = []
+        append = trades.append
+        for data in rows:
+            get = data.get
+            is_maker = get("is_maker")
+            fee = get("fee")
+            realized_pnl = get("realized_pnl")
+            append({
+                "wallet_address": wallet_address,
+                "account_id": account_id,
+                "trade_id": get("trade_id") or get("id", 0),
+                "symbol": get("symbol", ""),
+                "side": get("side", "").upper(),
+                "price": str(get("executed_price", 0)),
+                "quantity": str(get("executed_quantity", 0)),
+                "executed_at_ms": get("created_time") or get("timestamp") or now_ms,
+                "order_id": get("order_id"),
+                "fee": str(fee) if fee is not None else None,
+                "fee_token": get("fee_asset"),
+                "realized_pnl": str(realized_pnl) if realized_pnl is not None else None,
+                "is_taker": not is_maker if is_maker is not None else None,
+            })
+        return trades
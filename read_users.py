@@ -12,6 +12,8 @@ MongoDB Users Collection 讀取工具
     python read_users.py --wallet ADDRESS   # 依錢包地址查詢
     python read_users.py --affiliates       # 列出所有 affiliates
     python read_users.py --referrals AFF_ID # 查詢特定 affiliate 的下線
+    python read_users.py --verify ...       # 連線後先 ping 確認
+    python read_users.py --ensure-indexes   # 建立查詢用索引（維護用，需寫入權限）
 
 環境變數:
     MONGODB_URI     - MongoDB 連線 URI (預設: mongodb://localhost:27017)
@@ -22,15 +24,45 @@ import asyncio
 import argparse
 import os
 import sys
+import threading
+import time
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Callable
 
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCursor
 from dotenv import load_dotenv
 
 # 載入 .env 文件
 load_dotenv()
 
+# 列表顯示（format_user_summary 與推廣者 / 下線表格）實際用到的欄位
+SUMMARY_PROJECTION = {
+    "_id": 1,
+    "wallet_address": 1,
+    "is_affiliate": 1,
+    "total_volume": 1,
+    "max_referral_rate": 1,
+    "fee_discount_rate": 1,
+}
+
+# 串流讀取時每次 getMore 取回的文件數
+CURSOR_BATCH_SIZE = 100
+
+# 互動選單「列出所有用戶」的預設筆數（亦為預取筆數）
+DEFAULT_LIST_LIMIT = 20
+
+# 選單統計數字的快取秒數
+COUNTS_CACHE_TTL = 30.0
+
+# Motor 連線池設定：互動選單的連續查詢可重用已建立的連線
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": 50,
+    "minPoolSize": 5,
+    "serverSelectionTimeoutMS": 3000,
+    "connectTimeoutMS": 3000,
+    "socketTimeoutMS": 10000,
+}
+
 
 class UsersReader:
     """MongoDB Users Collection 讀取器"""
@@ -40,38 +72,80 @@ class UsersReader:
         self.database_name = database_name
         self.client: Optional[AsyncIOMotorClient] = None
         self.db = None
+        self._counts_cache: Optional[Tuple[int, int]] = None
+        self._counts_time = 0.0
+
+    async def connect(self, verify: bool = False):
+        """
+        建立資料庫連接
 
-    async def connect(self):
-        """建立資料庫連接"""
+        Args:
+            verify: 是否先 ping 確認連線；預設略過以省下一次往返，
+                連線問題會在 serverSelectionTimeoutMS 內於首次查詢時浮現
+        """
         try:
-            self.client = AsyncIOMotorClient(self.mongodb_uri)
+            self.client = AsyncIOMotorClient(self.mongodb_uri, **MONGO_CLIENT_OPTIONS)
             self.db = self.client[self.database_name]
-            # 測試連接
-            await self.client.admin.command('ping')
-            print(f"✓ 成功連接到 MongoDB: {self.database_name}")
+            if verify:
+                await self.client.admin.command('ping')
+                print(f"✓ 成功連接到 MongoDB: {self.database_name}")
         except Exception as e:
             print(f"✗ 連接 MongoDB 失敗: {e}")
             raise
 
+    async def ensure_indexes(self):
+        """
+        建立查詢用索引（已存在時為 no-op）
+
+        users collection 由其他系統管理，僅在明確指定 --ensure-indexes 時呼叫；
+        連線、權限等錯誤直接拋出。
+        """
+        await self.db.users.create_index("wallet_address")
+        await self.db.users.create_index(
+            "is_affiliate",
+            partialFilterExpression={"is_affiliate": True},
+        )
+        await self.db.users.create_index("parent_affiliate_id")
+
     async def disconnect(self):
         """關閉資料庫連接"""
         if self.client:
             self.client.close()
             print("✓ 已關閉資料庫連接")
 
-    async def get_all_users(self, limit: int = 100) -> List[Dict[str, Any]]:
+    def find_all_users(
+        self,
+        limit: int = 100,
+        projection: Optional[Dict[str, int]] = None
+    ) -> AsyncIOMotorCursor:
+        """
+        以 cursor 串流取得所有用戶，文件分批自伺服器取回
+
+        Args:
+            limit: 最大回傳數量，預設 100
+            projection: 只取回的欄位，None 表示完整文件
+
+        Returns:
+            可 async for 迭代的 cursor
+        """
+        return self.db.users.find({}, projection).limit(limit).batch_size(CURSOR_BATCH_SIZE)
+
+    async def get_all_users(
+        self,
+        limit: int = 100,
+        projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
         """
         取得所有用戶
 
         Args:
             limit: 最大回傳數量，預設 100
+            projection: 只取回的欄位，None 表示完整文件
 
         Returns:
             用戶列表
         """
-        cursor = self.db.users.find().limit(limit)
-        users = await cursor.to_list(length=limit)
-        return users
+        return await self.find_all_users(limit, projection).to_list(length=limit)
 
     async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -99,30 +173,71 @@ class UsersReader:
         user = await self.db.users.find_one({"wallet_address": wallet_address})
         return user
 
-    async def get_affiliates(self) -> List[Dict[str, Any]]:
+    def find_affiliates(
+        self,
+        projection: Optional[Dict[str, int]] = None
+    ) -> AsyncIOMotorCursor:
+        """
+        以 cursor 串流取得所有 affiliates（推廣者）
+
+        Args:
+            projection: 只取回的欄位，None 表示完整文件
+
+        Returns:
+            可 async for 迭代的 cursor
+        """
+        return self.db.users.find({"is_affiliate": True}, projection).batch_size(CURSOR_BATCH_SIZE)
+
+    async def get_affiliates(
+        self,
+        projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
         """
         取得所有 affiliates（推廣者）
 
+        Args:
+            projection: 只取回的欄位，None 表示完整文件
+
         Returns:
             affiliate 用戶列表
         """
-        cursor = self.db.users.find({"is_affiliate": True})
-        affiliates = await cursor.to_list(length=1000)
-        return affiliates
+        return await self.find_affiliates(projection).to_list(length=1000)
+
+    def find_referrals_by_affiliate(
+        self,
+        affiliate_id: str,
+        projection: Optional[Dict[str, int]] = None
+    ) -> AsyncIOMotorCursor:
+        """
+        以 cursor 串流取得特定 affiliate 的所有下線
+
+        Args:
+            affiliate_id: 推廣者 ID
+            projection: 只取回的欄位，None 表示完整文件
 
-    async def get_referrals_by_affiliate(self, affiliate_id: str) -> List[Dict[str, Any]]:
+        Returns:
+            可 async for 迭代的 cursor
+        """
+        return self.db.users.find(
+            {"parent_affiliate_id": affiliate_id}, projection
+        ).batch_size(CURSOR_BATCH_SIZE)
+
+    async def get_referrals_by_affiliate(
+        self,
+        affiliate_id: str,
+        projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
         """
         取得特定 affiliate 的所有下線
 
         Args:
             affiliate_id: 推廣者 ID
+            projection: 只取回的欄位，None 表示完整文件
 
         Returns:
             下線用戶列表
         """
-        cursor = self.db.users.find({"parent_affiliate_id": affiliate_id})
-        referrals = await cursor.to_list(length=1000)
-        return referrals
+        return await self.find_referrals_by_affiliate(affiliate_id, projection).to_list(length=1000)
 
     async def get_users_count(self) -> int:
         """取得用戶總數"""
@@ -134,6 +249,29 @@ class UsersReader:
         count = await self.db.users.count_documents({"is_affiliate": True})
         return count
 
+    async def get_counts(self) -> Tuple[int, int]:
+        """
+        取得 (用戶總數, affiliate 總數)，結果快取 COUNTS_CACHE_TTL 秒
+
+        Returns:
+            (用戶總數, affiliate 總數)
+        """
+        if (
+            self._counts_cache is not None
+            and time.monotonic() - self._counts_time < COUNTS_CACHE_TTL
+        ):
+            return self._counts_cache
+
+        # 兩個 count 分別可走 _id 索引與 is_affiliate partial 索引；
+        # 改用 $facet 聚合無法使用任何索引，每次都會掃描整個 collection
+        total_users, total_affiliates = await asyncio.gather(
+            self.get_users_count(),
+            self.get_affiliates_count(),
+        )
+        self._counts_cache = (total_users, total_affiliates)
+        self._counts_time = time.monotonic()
+        return self._counts_cache
+
 
 def format_timestamp(timestamp: Optional[int]) -> str:
     """格式化時間戳"""
@@ -167,13 +305,152 @@ def format_user(user: Dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
+def _row_prefix(user: Dict[str, Any]) -> str:
+    """列表各行共用的 ID、錢包地址兩欄（以 ljust 拼接，避免每列重複解析格式規格）"""
+    wallet = user.get('wallet_address')
+    wallet = wallet[:15] + '...' if wallet else 'N/A'
+    return user.get('_id', 'N/A')[:20].ljust(20) + ' | ' + wallet.ljust(18) + ' | '
+
+
 def format_user_summary(user: Dict[str, Any]) -> str:
     """格式化用戶摘要（單行）"""
-    user_id = user.get('_id', 'N/A')[:20]
-    wallet = user.get('wallet_address', 'N/A')[:15] + '...' if user.get('wallet_address') else 'N/A'
-    is_affiliate = "推廣者" if user.get('is_affiliate') else "一般"
+    label = "推廣者" if user.get('is_affiliate') else "一般"
     volume = user.get('total_volume', 0)
-    return f"{user_id:<20} | {wallet:<18} | {is_affiliate:<6} | 交易量: {volume:>12,.2f}"
+    return _row_prefix(user) + label.ljust(6) + ' | 交易量: ' + format(volume, '>12,.2f')
+
+
+def format_affiliate_row(aff: Dict[str, Any]) -> str:
+    """格式化推廣者列表的單行"""
+    rate = aff.get('max_referral_rate', 0) * 100
+    volume = aff.get('total_volume', 0)
+    return _row_prefix(aff) + format(rate, '>9.1f') + '% | ' + format(volume, '>15,.2f')
+
+
+def format_referral_row(ref: Dict[str, Any]) -> str:
+    """格式化下線列表的單行"""
+    discount = ref.get('fee_discount_rate', 0) * 100
+    volume = ref.get('total_volume', 0)
+    return _row_prefix(ref) + format(discount, '>9.1f') + '% | ' + format(volume, '>15,.2f')
+
+
+def write_lines(lines: List[str]):
+    """以單次 stdout 寫入輸出多行"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+async def print_table(
+    cursor: AsyncIOMotorCursor,
+    header: List[str],
+    format_row: Callable[[Dict[str, Any]], str]
+) -> int:
+    """
+    串流輸出表格，每累積 CURSOR_BATCH_SIZE 行寫出一次
+
+    Args:
+        cursor: 資料來源 cursor
+        header: 表頭各行，僅在有資料時輸出
+        format_row: 單筆文件的格式化函式
+
+    Returns:
+        輸出的資料筆數
+    """
+    count = 0
+    lines: List[str] = []
+    async for doc in cursor:
+        if count == 0:
+            lines.extend(header)
+        lines.append(format_row(doc))
+        count += 1
+        if len(lines) >= CURSOR_BATCH_SIZE:
+            write_lines(lines)
+            lines.clear()
+
+    if lines:
+        write_lines(lines)
+    return count
+
+
+# _read_line 已讀取但尚未交出的 stdin 位元組（一次 os.read 可能包含多行）
+_stdin_pending = b""
+
+
+def _read_line() -> str:
+    """
+    直接以 os.read 自 stdin 讀取一行
+
+    不經過 sys.stdin 的緩衝物件：背景執行緒若阻塞在 input() 上會持有其鎖，
+    Ctrl+C 後直譯器結束時取不到鎖而中止。
+
+    Returns:
+        一行輸入（不含換行）
+
+    Raises:
+        EOFError: stdin 已關閉且沒有剩餘資料
+    """
+    global _stdin_pending
+
+    fd = sys.stdin.fileno()
+    while b"\n" not in _stdin_pending:
+        chunk = os.read(fd, 4096)
+        if not chunk:
+            if not _stdin_pending:
+                raise EOFError
+            break
+        _stdin_pending += chunk
+
+    line, _, _stdin_pending = _stdin_pending.partition(b"\n")
+    return line.decode(sys.stdin.encoding or "utf-8", errors="replace").rstrip("\r")
+
+
+async def ainput(prompt: str = "") -> str:
+    """
+    在背景執行緒讀取一行輸入，等待期間不阻塞 event loop
+
+    使用 daemon 執行緒而非預設 executor：executor 的執行緒在結束時會被 join，
+    Ctrl+C 後程式會卡在尚未返回的讀取上。
+
+    Args:
+        prompt: 提示文字
+
+    Returns:
+        使用者輸入（不含換行）
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(line: Optional[str], error: Optional[BaseException]):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(line)
+
+    def read():
+        line, error = None, None
+        try:
+            line = _read_line()
+        except Exception as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(deliver, line, error)
+        except RuntimeError:
+            # event loop 已關閉，結果無人等待
+            pass
+
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
+
+def discard_task(task: asyncio.Task):
+    """取消未完成的預取 task；已完成者取回其例外，避免未取回警告"""
+    if task.done():
+        if not task.cancelled():
+            task.exception()
+    else:
+        task.cancel()
 
 
 async def interactive_menu(reader: UsersReader):
@@ -184,8 +461,7 @@ async def interactive_menu(reader: UsersReader):
         print("=" * 60)
 
         # 顯示統計資訊
-        total_users = await reader.get_users_count()
-        total_affiliates = await reader.get_affiliates_count()
+        total_users, total_affiliates = await reader.get_counts()
         print(f"總用戶數: {total_users} | 推廣者數: {total_affiliates}")
 
         print("-" * 60)
@@ -197,48 +473,74 @@ async def interactive_menu(reader: UsersReader):
         print("0. 退出")
         print("-" * 60)
 
-        choice = input("請選擇操作 (0-5): ").strip()
-
-        if choice == "0":
-            print("再見！")
-            break
-        elif choice == "1":
-            await handle_list_all_users(reader)
-        elif choice == "2":
-            await handle_query_by_id(reader)
-        elif choice == "3":
-            await handle_query_by_wallet(reader)
-        elif choice == "4":
-            await handle_list_affiliates(reader)
-        elif choice == "5":
-            await handle_query_referrals(reader)
-        else:
-            print("無效的選擇，請重試")
-
-
-async def handle_list_all_users(reader: UsersReader):
-    """處理列出所有用戶"""
-    limit_input = input("請輸入要顯示的數量 (預設 20): ").strip()
-    limit = int(limit_input) if limit_input.isdigit() else 20
-
-    users = await reader.get_all_users(limit=limit)
+        # 使用者閱讀選單時先預取預設的用戶列表，選 1 時可直接使用
+        prefetch = asyncio.create_task(
+            reader.get_all_users(limit=DEFAULT_LIST_LIMIT, projection=SUMMARY_PROJECTION)
+        )
+        try:
+            choice = (await ainput("請選擇操作 (0-5): ")).strip()
+
+            if choice == "0":
+                print("再見！")
+                break
+            elif choice == "1":
+                await handle_list_all_users(reader, prefetch)
+            elif choice == "2":
+                await handle_query_by_id(reader)
+            elif choice == "3":
+                await handle_query_by_wallet(reader)
+            elif choice == "4":
+                await handle_list_affiliates(reader)
+            elif choice == "5":
+                await handle_query_referrals(reader)
+            else:
+                print("無效的選擇，請重試")
+        finally:
+            discard_task(prefetch)
+
+
+async def handle_list_all_users(
+    reader: UsersReader,
+    prefetch: Optional[asyncio.Task] = None
+):
+    """
+    處理列出所有用戶
+
+    Args:
+        reader: 讀取器
+        prefetch: 預取前 DEFAULT_LIST_LIMIT 筆的 task，數量相同時直接使用
+    """
+    limit_input = (await ainput(f"請輸入要顯示的數量 (預設 {DEFAULT_LIST_LIMIT}): ")).strip()
+    limit = int(limit_input) if limit_input.isdigit() else DEFAULT_LIST_LIMIT
+
+    header = [
+        "\n" + "-" * 80,
+        f"{'ID':<20} | {'錢包地址':<18} | {'類型':<6} | {'交易量':>15}",
+        "-" * 80,
+    ]
+    if prefetch is not None and limit == DEFAULT_LIST_LIMIT:
+        users = await prefetch
+        count = len(users)
+        if users:
+            write_lines(header + [format_user_summary(user) for user in users])
+    else:
+        count = await print_table(
+            reader.find_all_users(limit=limit, projection=SUMMARY_PROJECTION),
+            header,
+            format_user_summary,
+        )
 
-    if not users:
+    if not count:
         print("\n找不到任何用戶")
         return
 
-    print(f"\n找到 {len(users)} 位用戶:")
-    print("-" * 80)
-    print(f"{'ID':<20} | {'錢包地址':<18} | {'類型':<6} | {'交易量':>15}")
     print("-" * 80)
-
-    for user in users:
-        print(format_user_summary(user))
+    print(f"共 {count} 位用戶")
 
 
 async def handle_query_by_id(reader: UsersReader):
     """處理依 ID 查詢"""
-    user_id = input("請輸入用戶 ID: ").strip()
+    user_id = (await ainput("請輸入用戶 ID: ")).strip()
 
     if not user_id:
         print("用戶 ID 不能為空")
@@ -254,7 +556,7 @@ async def handle_query_by_id(reader: UsersReader):
 
 async def handle_query_by_wallet(reader: UsersReader):
     """處理依錢包地址查詢"""
-    wallet = input("請輸入錢包地址: ").strip()
+    wallet = (await ainput("請輸入錢包地址: ")).strip()
 
     if not wallet:
         print("錢包地址不能為空")
@@ -270,35 +572,37 @@ async def handle_query_by_wallet(reader: UsersReader):
 
 async def handle_list_affiliates(reader: UsersReader):
     """處理列出所有 affiliates"""
-    affiliates = await reader.get_affiliates()
+    count = await print_table(
+        reader.find_affiliates(projection=SUMMARY_PROJECTION),
+        [
+            "\n" + "-" * 80,
+            f"{'ID':<20} | {'錢包地址':<18} | {'最大返佣率':>10} | {'交易量':>15}",
+            "-" * 80,
+        ],
+        format_affiliate_row,
+    )
 
-    if not affiliates:
+    if not count:
         print("\n找不到任何推廣者")
         return
 
-    print(f"\n找到 {len(affiliates)} 位推廣者:")
-    print("-" * 80)
-    print(f"{'ID':<20} | {'錢包地址':<18} | {'最大返佣率':>10} | {'交易量':>15}")
     print("-" * 80)
-
-    for aff in affiliates:
-        user_id = aff.get('_id', 'N/A')[:20]
-        wallet = aff.get('wallet_address', 'N/A')[:15] + '...' if aff.get('wallet_address') else 'N/A'
-        rate = aff.get('max_referral_rate', 0) * 100
-        volume = aff.get('total_volume', 0)
-        print(f"{user_id:<20} | {wallet:<18} | {rate:>9.1f}% | {volume:>15,.2f}")
+    print(f"共 {count} 位推廣者")
 
 
 async def handle_query_referrals(reader: UsersReader):
     """處理查詢特定 affiliate 的下線"""
-    affiliate_id = input("請輸入推廣者 ID: ").strip()
+    affiliate_id = (await ainput("請輸入推廣者 ID: ")).strip()
 
     if not affiliate_id:
         print("推廣者 ID 不能為空")
         return
 
-    # 先確認該 affiliate 存在
-    affiliate = await reader.get_user_by_id(affiliate_id)
+    # 推廣者檢查與下線查詢互不相依，同時送出；檢查未通過時直接捨棄下線結果
+    affiliate, referrals = await asyncio.gather(
+        reader.get_user_by_id(affiliate_id),
+        reader.get_referrals_by_affiliate(affiliate_id, projection=SUMMARY_PROJECTION),
+    )
     if not affiliate:
         print(f"\n找不到推廣者: {affiliate_id}")
         return
@@ -307,23 +611,17 @@ async def handle_query_referrals(reader: UsersReader):
         print(f"\n用戶 {affiliate_id} 不是推廣者")
         return
 
-    referrals = await reader.get_referrals_by_affiliate(affiliate_id)
-
     if not referrals:
         print(f"\n推廣者 {affiliate_id} 沒有下線用戶")
         return
 
-    print(f"\n推廣者 {affiliate_id} 的下線用戶 ({len(referrals)} 人):")
-    print("-" * 80)
-    print(f"{'ID':<20} | {'錢包地址':<18} | {'手續費折扣':>10} | {'交易量':>15}")
-    print("-" * 80)
-
-    for ref in referrals:
-        user_id = ref.get('_id', 'N/A')[:20]
-        wallet = ref.get('wallet_address', 'N/A')[:15] + '...' if ref.get('wallet_address') else 'N/A'
-        discount = ref.get('fee_discount_rate', 0) * 100
-        volume = ref.get('total_volume', 0)
-        print(f"{user_id:<20} | {wallet:<18} | {discount:>9.1f}% | {volume:>15,.2f}")
+    write_lines([
+        f"\n推廣者 {affiliate_id} 的下線用戶 ({len(referrals)} 人):",
+        "-" * 80,
+        f"{'ID':<20} | {'錢包地址':<18} | {'手續費折扣':>10} | {'交易量':>15}",
+        "-" * 80,
+        *(format_referral_row(ref) for ref in referrals),
+    ])
 
 
 async def run_cli(args: argparse.Namespace, reader: UsersReader):
@@ -334,8 +632,7 @@ async def run_cli(args: argparse.Namespace, reader: UsersReader):
             print("找不到任何用戶")
             return
         print(f"找到 {len(users)} 位用戶:\n")
-        for user in users:
-            print(format_user(user))
+        write_lines([format_user(user) for user in users])
 
     elif args.id:
         user = await reader.get_user_by_id(args.id)
@@ -357,8 +654,7 @@ async def run_cli(args: argparse.Namespace, reader: UsersReader):
             print("找不到任何推廣者")
             return
         print(f"找到 {len(affiliates)} 位推廣者:\n")
-        for aff in affiliates:
-            print(format_user(aff))
+        write_lines([format_user(aff) for aff in affiliates])
 
     elif args.referrals:
         referrals = await reader.get_referrals_by_affiliate(args.referrals)
@@ -366,8 +662,7 @@ async def run_cli(args: argparse.Namespace, reader: UsersReader):
             print(f"推廣者 {args.referrals} 沒有下線用戶")
             return
         print(f"推廣者 {args.referrals} 的下線用戶 ({len(referrals)} 人):\n")
-        for ref in referrals:
-            print(format_user(ref))
+        write_lines([format_user(ref) for ref in referrals])
 
 
 def parse_args() -> argparse.Namespace:
@@ -384,6 +679,7 @@ def parse_args() -> argparse.Namespace:
     python read_users.py --wallet 0x742...  # 依錢包地址查詢
     python read_users.py --affiliates       # 列出所有推廣者
     python read_users.py --referrals aff123 # 查詢推廣者的下線
+    python read_users.py --ensure-indexes   # 建立查詢用索引 (維護用)
         """
     )
 
@@ -430,6 +726,16 @@ def parse_args() -> argparse.Namespace:
         default=os.getenv("DATABASE_NAME", "referral_system"),
         help="資料庫名稱 (預設使用環境變數 DATABASE_NAME)"
     )
+    parser.add_argument(
+        "--ensure-indexes",
+        action="store_true",
+        help="建立 users 查詢用索引後結束（維護用，需 createIndex 權限）"
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="連線後先 ping MongoDB 確認可用"
+    )
 
     return parser.parse_args()
 
@@ -446,7 +752,12 @@ async def main():
 
     try:
         # 連接資料庫
-        await reader.connect()
+        await reader.connect(verify=args.verify)
+
+        if args.ensure_indexes:
+            await reader.ensure_indexes()
+            print("✓ 已建立查詢用索引")
+            return
 
         # 判斷是互動模式還是命令列模式
         has_cli_args = any([args.all, args.id, args.wallet, args.affiliates, args.referrals])
@@ -456,7 +767,8 @@ async def main():
         else:
             await interactive_menu(reader)
 
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        # 等待 ainput() 時按下 Ctrl+C，asyncio.run 會以取消主 task 的方式傳入
         print("\n\n操作已取消")
     except Exception as e:
         print(f"\n錯誤: {e}")
@@ -466,4 +778,8 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        # main() 已輸出取消訊息，asyncio.run 仍會重新拋出 KeyboardInterrupt
+        pass
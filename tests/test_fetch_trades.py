@@ -0,0 +1,111 @@
+"""
+TradeFetcher 寫入緩衝測試
+"""
+
+import unittest
+
+try:
+    import fetch_trades
+except ImportError as e:
+    raise unittest.SkipTest(f"缺少相依套件: {e.name}")
+
+
+class FakeUpsert:
+    """
+    模擬 upsert_*_trades：批次中含有壞資料的錢包時整個 transaction 失敗
+
+    記錄每次呼叫的錢包集合，成功時回傳插入筆數。
+    """
+
+    def __init__(self, bad_wallets):
+        self.bad_wallets = set(bad_wallets)
+        self.calls = []
+
+    async def __call__(self, trades, fetch_statuses=None):
+        wallets = {s["wallet_address"] for s in fetch_statuses}
+        self.calls.append(wallets)
+        if wallets & self.bad_wallets:
+            raise ValueError("numeric field overflow")
+        return len(trades)
+
+
+def make_fetcher(upsert):
+    fetcher = fetch_trades.TradeFetcher(
+        mongodb_uri="mongodb://localhost:27017",
+        mongodb_database="test",
+        postgres_host="localhost",
+        postgres_port=5432,
+        postgres_db="test",
+        postgres_user="test",
+        postgres_password="",
+    )
+    fetcher._upserts["hyperliquid"] = upsert
+    return fetcher
+
+
+def trade(wallet, tid):
+    return {"wallet_address": wallet, "trade_id": tid, "executed_at_ms": 1_700_000_000_000 + tid}
+
+
+class FlushTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_batch_failure_retries_each_wallet(self):
+        """批次寫入失敗時逐一錢包重試，只有仍失敗的錢包記錄錯誤"""
+        upsert = FakeUpsert(bad_wallets={"0xbad"})
+        fetcher = make_fetcher(upsert)
+
+        await fetcher._buffer_trades("hyperliquid", "0xgood", [trade("0xgood", 1), trade("0xgood", 2)])
+        await fetcher._buffer_trades("hyperliquid", "0xbad", [trade("0xbad", 3)])
+        await fetcher._buffer_trades("hyperliquid", "0xother", [trade("0xother", 4)])
+        await fetcher._flush("hyperliquid")
+
+        # 第一次為整批，之後每個錢包各一次
+        self.assertEqual(upsert.calls[0], {"0xgood", "0xbad", "0xother"})
+        self.assertEqual(upsert.calls[1:], [{"0xgood"}, {"0xbad"}, {"0xother"}])
+
+        self.assertEqual(fetcher.stats["hyperliquid_trades"], 3)
+        self.assertEqual(fetcher.stats["errors"], 1)
+        self.assertEqual(
+            [(s["wallet_address"], s["platform"]) for s in fetcher._error_statuses],
+            [("0xbad", "hyperliquid")],
+        )
+        self.assertEqual(fetcher._buffers["hyperliquid"], [])
+        self.assertEqual(fetcher._pending_statuses["hyperliquid"], [])
+
+    async def test_per_wallet_retry_keeps_trades_and_status_together(self):
+        """逐一重試時每個錢包只帶自己的交易與抓取狀態"""
+        seen = []
+
+        async def upsert(trades, fetch_statuses=None):
+            if len(fetch_statuses) > 1:
+                raise ValueError("batch failed")
+            seen.append((
+                fetch_statuses[0]["wallet_address"],
+                sorted(t["trade_id"] for t in trades),
+            ))
+            return len(trades)
+
+        fetcher = make_fetcher(upsert)
+        await fetcher._buffer_trades("hyperliquid", "0xa", [trade("0xa", 1), trade("0xa", 2)])
+        await fetcher._buffer_trades("hyperliquid", "0xb", [trade("0xb", 3)])
+        await fetcher._flush("hyperliquid")
+
+        self.assertEqual(seen, [("0xa", [1, 2]), ("0xb", [3])])
+        self.assertEqual(fetcher.stats["errors"], 0)
+        self.assertEqual(fetcher._error_statuses, [])
+
+    async def test_successful_batch_writes_once(self):
+        upsert = FakeUpsert(bad_wallets=())
+        fetcher = make_fetcher(upsert)
+
+        await fetcher._buffer_trades("hyperliquid", "0xa", [trade("0xa", 1)])
+        await fetcher._buffer_trades("hyperliquid", "0xb", [trade("0xb", 2)])
+        await fetcher._flush("hyperliquid")
+
+        self.assertEqual(len(upsert.calls), 1)
+        self.assertEqual(fetcher.stats["hyperliquid_trades"], 2)
+        self.assertEqual(fetcher.stats["errors"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
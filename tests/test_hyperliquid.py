@@ -0,0 +1,178 @@
+"""
+HyperliquidFetcher 抓取流程測試 (以假的 Info API 取代 HTTP 請求)
+"""
+
+import asyncio
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+try:
+    import aiohttp
+    from multidict import CIMultiDict, CIMultiDictProxy
+    from yarl import URL
+
+    from fetchers import hyperliquid
+    from fetchers.hyperliquid import HyperliquidFetcher
+except ImportError as e:
+    raise unittest.SkipTest(f"缺少相依套件: {e.name}")
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+END = datetime(2025, 7, 1, tzinfo=timezone.utc)
+START_MS = int(START.timestamp() * 1000)
+
+
+def rate_limited() -> aiohttp.ClientResponseError:
+    """建立與 raise_for_status() 相同形式的 429 錯誤"""
+    url = URL("https://api.hyperliquid.xyz/info")
+    return aiohttp.ClientResponseError(
+        aiohttp.RequestInfo(url, "POST", CIMultiDictProxy(CIMultiDict()), url),
+        (),
+        status=429,
+        message="Too Many Requests",
+    )
+
+
+def fill(time_ms: int, tid: int):
+    return {
+        "tid": tid,
+        "time": time_ms,
+        "coin": "BTC",
+        "side": "B",
+        "px": "100000.0",
+        "sz": "0.01",
+        "oid": tid,
+        "fee": "0.1",
+        "feeToken": "USDC",
+        "closedPnl": "0.0",
+        "crossed": True,
+    }
+
+
+class FakeInfoApi:
+    """
+    模擬 userFillsByTime：每個區間回傳一筆 fill，fail_starts 內的區間一律 429
+
+    transient 內的區間只在第一次請求時 429。
+    """
+
+    def __init__(self, fail_starts=(), transient=()):
+        self.fail_starts = set(fail_starts)
+        self.transient = set(transient)
+        self.calls = []
+
+    async def __call__(self, payload):
+        start = payload["startTime"]
+        self.calls.append(start)
+        if start in self.fail_starts:
+            raise rate_limited()
+        if start in self.transient:
+            self.transient.discard(start)
+            raise rate_limited()
+        return [fill(start + 1, start)]
+
+
+class HyperliquidFetcherTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.fetcher = HyperliquidFetcher()
+        # 重試不實際等待
+        patcher = mock.patch.object(hyperliquid, "_retry_delay", return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.fetcher.close()
+
+
+class RetryExhaustionTest(HyperliquidFetcherTestCase):
+
+    async def test_interval_out_of_retries_fails_whole_fetch(self):
+        """任一區間重試用盡時整個錢包失敗，不回傳其餘區間的部分結果"""
+        second_window = START_MS + hyperliquid.FETCH_INTERVAL_MS
+        api = FakeInfoApi(fail_starts={second_window})
+        self.fetcher._post_info = api
+
+        with self.assertRaises(aiohttp.ClientResponseError) as ctx:
+            await self.fetcher.fetch_trades("0xabc", START, END)
+
+        self.assertEqual(ctx.exception.status, 429)
+        self.assertEqual(api.calls.count(second_window), hyperliquid.MAX_RETRIES)
+        # 失敗後不留下進行中的請求
+        self.assertEqual(self.fetcher._inflight, {})
+
+    async def test_transient_failure_is_retried(self):
+        second_window = START_MS + hyperliquid.FETCH_INTERVAL_MS
+        api = FakeInfoApi(transient={second_window})
+        self.fetcher._post_info = api
+
+        trades = await self.fetcher.fetch_trades("0xabc", START, END)
+
+        self.assertEqual(api.calls.count(second_window), 2)
+        self.assertIn(second_window + 1, [t["executed_at_ms"] for t in trades])
+
+
+
+class SlowLoader:
+    """模擬 _load_fills_for_interval：等到 release 後才回傳，記錄實際請求次數"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, wallet_address, start_ts, end_ts):
+        self.calls += 1
+        await self.release.wait()
+        return [fill(start_ts + 1, self.calls)]
+
+
+class InflightCoalescingTest(HyperliquidFetcherTestCase):
+
+    async def test_concurrent_callers_share_one_request(self):
+        loader = SlowLoader()
+        self.fetcher._load_fills_for_interval = loader
+
+        tasks = [
+            asyncio.create_task(self.fetcher._fetch_fills_for_interval("0xabc", 0, 1))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        loader.release.set()
+        results = await asyncio.gather(*tasks)
+
+        self.assertEqual(loader.calls, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(self.fetcher._inflight, {})
+
+    async def test_cancelled_owner_does_not_cancel_waiters(self):
+        """發起請求的 task 被取消時，其他等待者重新請求而非收到 CancelledError"""
+        loader = SlowLoader()
+        self.fetcher._load_fills_for_interval = loader
+
+        owner = asyncio.create_task(self.fetcher._fetch_fills_for_interval("0xabc", 0, 1))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(self.fetcher._fetch_fills_for_interval("0xabc", 0, 1))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+
+        owner.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await owner
+
+        # 讓等待者收到放棄通知並重新登記請求後才放行
+        for _ in range(10):
+            await asyncio.sleep(0)
+        # 發起者的請求被放棄後，由一個等待者重新請求，另一個共用其結果
+        self.assertEqual(loader.calls, 2)
+
+        loader.release.set()
+        results = await asyncio.gather(*waiters)
+
+        self.assertIs(results[0], results[1])
+        self.assertEqual(self.fetcher._inflight, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
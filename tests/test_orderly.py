@@ -0,0 +1,152 @@
+"""
+OrderlyFetcher 分頁抓取與 RateLimiter 測試 (以假的 REST client 取代 HTTP 請求)
+"""
+
+import asyncio
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+try:
+    from fetchers import orderly
+    from fetchers.orderly import OrderlyFetcher, PAGE_SIZE, RateLimiter
+except ImportError as e:
+    raise unittest.SkipTest(f"缺少相依套件: {e.name}")
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+END = datetime(2025, 7, 1, tzinfo=timezone.utc)
+
+CREDENTIALS = {
+    "orderly_key": "ed25519:key",
+    "orderly_secret": "ed25519:secret",
+    "account_id": "0xaccount",
+}
+
+
+def row(page: int, i: int):
+    return {
+        "id": page * PAGE_SIZE + i,
+        "symbol": "PERP_BTC_USDC",
+        "side": "BUY",
+        "executed_price": 100000.0,
+        "executed_quantity": 0.01,
+        "fee": 0.1,
+        "fee_asset": "USDC",
+        "created_time": 1_735_689_600_000 + page * PAGE_SIZE + i,
+    }
+
+
+class FakePages:
+    """
+    模擬 _fetch_page：last_page 之前為滿頁，last_page 只有一筆，之後為空頁
+
+    failing 內的頁碼拋出錯誤。
+    """
+
+    def __init__(self, last_page: int, failing=()):
+        self.last_page = last_page
+        self.failing = set(failing)
+        self.requested = []
+
+    async def __call__(self, client, start_ts, end_ts, page):
+        self.requested.append(page)
+        if page in self.failing:
+            raise RuntimeError(f"page {page} failed")
+        if page < self.last_page:
+            return [row(page, i) for i in range(PAGE_SIZE)]
+        if page == self.last_page:
+            return [row(page, 0)]
+        return []
+
+
+class OrderlyFetcherTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.fetcher = OrderlyFetcher()
+        # 不建立真正的簽署 client
+        self.fetcher._get_client = mock.Mock(return_value=object())
+
+    async def asyncTearDown(self):
+        await self.fetcher.close()
+
+
+class WindowedPagingTest(OrderlyFetcherTestCase):
+
+    async def test_page_error_in_window_fails_whole_fetch(self):
+        """視窗內任一頁失敗時整個錢包失敗，不回傳已抓到的部分頁"""
+        pages = FakePages(last_page=6, failing={3})
+        self.fetcher._fetch_page = pages
+
+        with self.assertRaisesRegex(RuntimeError, "page 3 failed"):
+            await self.fetcher.fetch_trades("0xabc", START, END, **CREDENTIALS)
+
+    async def test_error_after_last_page_is_ignored(self):
+        """不滿一頁之後的頁本來就會捨棄，其錯誤不影響結果"""
+        pages = FakePages(last_page=3, failing={5})
+        self.fetcher._fetch_page = pages
+
+        trades = await self.fetcher.fetch_trades("0xabc", START, END, **CREDENTIALS)
+
+        self.assertEqual(len(trades), 2 * PAGE_SIZE + 1)
+        self.assertIn(5, pages.requested)
+
+    async def test_collects_all_pages(self):
+        pages = FakePages(last_page=12)
+        self.fetcher._fetch_page = pages
+
+        trades = await self.fetcher.fetch_trades("0xabc", START, END, **CREDENTIALS)
+
+        self.assertEqual(len(trades), 11 * PAGE_SIZE + 1)
+        self.assertEqual(len({t["trade_id"] for t in trades}), len(trades))
+
+
+
+class RateLimiterTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_acquires_spend_known_quota(self):
+        """並行請求依本地扣減的額度放行，用盡後等到 reset"""
+        limiter = RateLimiter()
+        limiter.update({"X-RateLimit-Remaining": "3", "X-RateLimit-Reset": "0.05"})
+
+        tasks = [asyncio.create_task(limiter.acquire()) for _ in range(5)]
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        self.assertEqual(sum(t.done() for t in tasks), 3)
+        self.assertEqual(limiter.remaining, 0)
+
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+
+    async def test_unknown_quota_does_not_block(self):
+        limiter = RateLimiter()
+        await asyncio.wait_for(
+            asyncio.gather(*(limiter.acquire() for _ in range(20))), timeout=1
+        )
+        self.assertIsNone(limiter.remaining)
+
+    async def test_response_headers_override_local_count(self):
+        limiter = RateLimiter()
+        limiter.update({"X-RateLimit-Remaining": "2", "X-RateLimit-Reset": "10"})
+        await limiter.acquire()
+        await limiter.acquire()
+        self.assertEqual(limiter.remaining, 0)
+
+        limiter.update({"X-RateLimit-Remaining": "5", "X-RateLimit-Reset": "10"})
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+        self.assertEqual(limiter.remaining, 4)
+
+    async def test_block_holds_requests_until_deadline(self):
+        """429 後 block() 期間不放行請求"""
+        limiter = RateLimiter()
+        limiter.block(0.05)
+
+        task = asyncio.create_task(limiter.acquire())
+        for _ in range(5):
+            await asyncio.sleep(0)
+        self.assertFalse(task.done())
+
+        await asyncio.wait_for(task, timeout=1)
+
+
+if __name__ == "__main__":
+    unittest.main()